@@ -0,0 +1,100 @@
+"""Anytime (early-exit) inference for binary RandomForest models.
+
+Trees are evaluated in small batches over the preprocessed input. After each
+batch the running mean of the per-tree survival probabilities is compared
+with 0.5: once a confidence interval around it (with finite-population
+correction, since the target is the full-forest average) no longer contains
+0.5, the full forest's decision is settled and evaluation stops. Evaluation
+also stops when the latency budget for tree traversal (preprocessing not
+included) is spent, but never before `min_trees`; the result then reports
+`exact=False` together with how many trees were used.
+"""
+import time
+
+import numpy as np
+
+
+class AnytimeResult:
+    __slots__ = ("predictions", "proba", "trees_used", "trees_total", "reason")
+
+    def __init__(self, predictions, proba, trees_used, trees_total, reason):
+        self.predictions = predictions
+        self.proba = proba
+        self.trees_used = trees_used
+        self.trees_total = trees_total
+        self.reason = reason  # complete, settled or budget
+
+    @property
+    def exact(self):
+        return self.trees_used == self.trees_total
+
+
+class AnytimeForest:
+    """Incremental evaluator built once per model artifact.
+
+    Accepts either a fitted RandomForestClassifier or a Pipeline ending in
+    one; leaf class distributions are normalised up front so each tree costs
+    one `tree_.apply` plus an array lookup.
+    """
+
+    def __init__(self, model):
+        if hasattr(model, "steps"):
+            self.preprocess = model[:-1] if len(model.steps) > 1 else None
+            forest = model[-1]
+        else:
+            self.preprocess = None
+            forest = model
+        if not hasattr(forest, "estimators_"):
+            raise TypeError(f"{type(forest).__name__} is not a fitted tree ensemble")
+        if len(forest.classes_) != 2:
+            raise TypeError("Anytime inference only supports binary classifiers")
+        self.classes = forest.classes_
+        self.trees = [estimator.tree_ for estimator in forest.estimators_]
+        self.positive_leaf_proba = []
+        for tree in self.trees:
+            value = tree.value[:, 0, :]
+            totals = value.sum(axis=1)
+            totals[totals == 0] = 1.0
+            self.positive_leaf_proba.append(value[:, 1] / totals)
+
+    def transform(self, X):
+        """Run the preprocessing steps and return a float32 C-contiguous array"""
+        Xt = self.preprocess.transform(X) if self.preprocess is not None else X
+        if hasattr(Xt, "toarray"):
+            Xt = Xt.toarray()
+        return np.ascontiguousarray(Xt, dtype=np.float32)
+
+    def predict(self, X, budget_seconds=None, z=2.58, min_trees=10, batch_trees=8):
+        Xt = self.transform(X)
+        # Budget chỉ tính phần duyệt cây; preprocess có chi phí cố định, không phụ thuộc số cây
+        start = time.perf_counter()
+        n_total = len(self.trees)
+        total = np.zeros(Xt.shape[0])
+        total_sq = np.zeros(Xt.shape[0])
+        n = 0
+        reason = "complete"
+        while n < n_total:
+            end = min(n + batch_trees, n_total)
+            for i in range(n, end):
+                p = self.positive_leaf_proba[i][self.trees[i].apply(Xt)]
+                total += p
+                total_sq += p * p
+            n = end
+            if n == n_total:
+                break
+            if n >= min_trees:
+                mean = total / n
+                # Sàn phương sai 0.25/n tránh dừng quá sớm khi vài cây đầu trùng nhau
+                variance = np.maximum(total_sq / n - mean * mean, 0.25 / n) * n / (n - 1)
+                fpc = (n_total - n) / (n_total - 1)
+                half_width = z * np.sqrt(variance / n * fpc)
+                if np.all(np.abs(mean - 0.5) > half_width):
+                    reason = "settled"
+                    break
+            if n >= min_trees and budget_seconds is not None and time.perf_counter() - start >= budget_seconds:
+                reason = "budget"
+                break
+        positive = total / n
+        proba = np.column_stack([1.0 - positive, positive])
+        predictions = self.classes[(positive > 0.5).astype(int)]
+        return AnytimeResult(predictions, proba, n, n_total, reason)
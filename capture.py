@@ -0,0 +1,139 @@
+"""Sampled traffic capture for the Titanic API.
+
+The request path only does a `put_nowait` on a bounded queue with the raw
+body bytes; a daemon thread decodes them, owns the gzip file, rotates it by
+size and prunes old files. When the queue is full the record is dropped and
+counted instead of slowing the request down.
+"""
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+import zlib
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def decode_body(raw):
+    """Decode a captured body: JSON when possible, else text, None when empty"""
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw.decode("utf-8", errors="replace")
+
+
+class TrafficCapture:
+    """Append captured requests to rotating, gzip-compressed JSONL files"""
+
+    def __init__(self, directory, max_bytes=50 * 1024 * 1024, backup_count=10, queue_size=10000):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.written = 0
+        self._file = None
+        self._file_bytes = 0
+        self._thread = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="traffic-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        if self._thread is None:
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, record):
+        """Queue a record for writing; never blocks the caller"""
+        try:
+            self.queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _open(self):
+        name = datetime.now().strftime("capture-%Y%m%d-%H%M%S-%f.jsonl.gz")
+        self._file = gzip.open(os.path.join(self.directory, name), "wt", encoding="utf-8")
+        self._file_bytes = 0
+        self._prune()
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _prune(self):
+        files = sorted(glob.glob(os.path.join(self.directory, "capture-*.jsonl.gz")))
+        for path in files[:-self.backup_count] if self.backup_count > 0 else []:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"⚠️ Could not remove old capture file {path}: {e}")
+
+    def _run(self):
+        while True:
+            try:
+                record = self.queue.get(timeout=1.0)
+            except queue.Empty:
+                # Idle: đẩy dữ liệu đã nén xuống disk. File vẫn chưa có gzip
+                # end-of-stream marker cho tới khi rotate/stop; read_capture
+                # đọc được các dòng hoàn chỉnh trước chỗ bị cắt
+                if self._file is not None:
+                    self._file.flush()
+                continue
+            if record is _STOP:
+                break
+            try:
+                if self._file is None or self._file_bytes >= self.max_bytes:
+                    self._close()
+                    self._open()
+                # Body được submit dạng bytes; decode JSON ở đây thay vì trên event loop
+                record = {key: decode_body(value) if isinstance(value, bytes) else value
+                          for key, value in record.items()}
+                line = json.dumps(record, default=str) + "\n"
+                self._file.write(line)
+                self._file_bytes += len(line)
+                self.written += 1
+            except Exception as e:
+                logger.error(f"❌ Traffic capture write failed: {e}")
+        self._close()
+
+
+def read_capture(paths):
+    """Yield captured records from one or more capture files, in file order.
+
+    The file still being written (or one left behind by a crash) has no gzip
+    end-of-stream marker; its complete lines are yielded and the rest skipped.
+    """
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        try:
+            with opener(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # Dòng cuối có thể bị cắt giữa chừng
+                        continue
+        except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+            logger.warning(f"⚠️ Capture file {path} is truncated or still being written, read up to the cut: {e}")
@@ -0,0 +1,165 @@
+"""Streaming input-drift monitoring against a reference profile.
+
+The reference profile is a JSON file stored next to the model artifact
+(`best_rf_model.profile.json`, built by scripts/build_drift_profile.py). It
+fixes the bin edges for numeric features and the category list for
+categorical ones, so every request only does a bisect or dict lookup and
+increments one preallocated counter per feature. A background thread
+periodically turns the counts into PSI and KL divergence scores and then
+decays the counts so the scores follow recent traffic.
+
+Profile format:
+    {"numeric": {"Age": {"edges": [...], "proportions": [...]}},
+     "categorical": {"Sex": {"categories": ["male", "female"], "proportions": [...]}}}
+Numeric features have len(edges) + 1 buckets; categorical features have one
+bucket per category plus a trailing "other" bucket.
+"""
+import itertools
+import json
+import logging
+import math
+import os
+import threading
+from bisect import bisect_right
+
+logger = logging.getLogger(__name__)
+
+EPSILON = 1e-4
+
+
+def profile_path_for(model_path):
+    return os.path.splitext(model_path)[0] + ".profile.json"
+
+
+def _smoothed(counts):
+    total = sum(counts) + EPSILON * len(counts)
+    return [(count + EPSILON) / total for count in counts]
+
+
+def psi(expected, actual):
+    """Population stability index between two proportion vectors"""
+    return sum((a - e) * math.log(a / e) for e, a in zip(expected, actual))
+
+
+def kl_divergence(actual, expected):
+    """KL(actual || expected)"""
+    return sum(a * math.log(a / e) for e, a in zip(expected, actual))
+
+
+class DriftMonitor:
+    """Fixed-bin streaming histograms plus periodic PSI/KL against a reference"""
+
+    def __init__(self, decay=0.5, min_samples=50):
+        self.decay = decay
+        self.min_samples = min_samples
+        self.profile_path = None
+        self.scores = {}
+        self.samples = 0
+        self.window_samples = 0
+        self._numeric = {}
+        self._categorical = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return bool(self._numeric or self._categorical)
+
+    def load_profile(self, path):
+        """Load a reference profile and reset the counters"""
+        with open(path) as f:
+            profile = json.load(f)
+        numeric = {}
+        for feature, spec in profile.get("numeric", {}).items():
+            edges = [float(edge) for edge in spec["edges"]]
+            reference = _smoothed([float(p) for p in spec["proportions"]])
+            if len(reference) != len(edges) + 1:
+                raise ValueError(f"Profile for '{feature}' needs len(edges) + 1 proportions")
+            numeric[feature] = (edges, reference, [0] * len(reference))
+        categorical = {}
+        for feature, spec in profile.get("categorical", {}).items():
+            index = {value: i for i, value in enumerate(spec["categories"])}
+            reference = _smoothed([float(p) for p in spec["proportions"]])
+            if len(reference) != len(index) + 1:
+                raise ValueError(f"Profile for '{feature}' needs one proportion per category plus 'other'")
+            categorical[feature] = (index, reference, [0] * len(reference))
+        with self._lock:
+            self._numeric = numeric
+            self._categorical = categorical
+            self.samples = 0
+            self.window_samples = 0
+            self.scores = {}
+            self.profile_path = path
+
+    def clear(self):
+        """Drop the profile, counters and scores (the served model has no profile)"""
+        with self._lock:
+            self._numeric = {}
+            self._categorical = {}
+            self.samples = 0
+            self.window_samples = 0
+            self.scores = {}
+            self.profile_path = None
+
+    def update(self, row):
+        """Record one input row; O(1) per feature and no per-call containers"""
+        with self._lock:
+            for feature, (edges, _, counts) in self._numeric.items():
+                counts[bisect_right(edges, row[feature])] += 1
+            for feature, (index, _, counts) in self._categorical.items():
+                counts[index.get(row[feature], len(counts) - 1)] += 1
+            self.samples += 1
+
+    def _features(self):
+        return itertools.chain(self._numeric.items(), self._categorical.items())
+
+    def recompute(self):
+        """Recompute divergence scores from the current window, then decay it"""
+        with self._lock:
+            if self.samples < self.min_samples:
+                return self.scores
+            snapshot = [
+                (feature, reference, list(counts))
+                for feature, (_, reference, counts) in self._features()
+            ]
+            window = self.samples
+            profile_path = self.profile_path
+            for _, (_, _, counts) in self._features():
+                for i in range(len(counts)):
+                    counts[i] *= self.decay
+            self.samples *= self.decay
+        scores = {}
+        for feature, reference, counts in snapshot:
+            actual = _smoothed(counts)
+            scores[feature] = {
+                "psi": psi(reference, actual),
+                "kl": kl_divergence(actual, reference),
+            }
+        with self._lock:
+            # Profile có thể đã bị thay/xóa trong lúc tính (model hot-reload)
+            if self.profile_path == profile_path:
+                self.scores = scores
+                self.window_samples = window
+        return scores
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.recompute()
+            except Exception as e:
+                logger.error(f"❌ Drift recompute failed: {e}")
+
+    def start(self, interval=60.0):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="drift-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=5.0)
+        self._thread = None
@@ -0,0 +1,89 @@
+"""Per-prediction feature contributions for binary RandomForest models.
+
+Uses the exact path decomposition for tree ensembles: walking from the root
+to a leaf, each split moves the node's survival probability, and that change
+is credited to the split feature. The root value (bias) plus the credited
+changes equals the leaf value exactly, and averaging over trees gives the
+forest's probability.
+
+The path from the root to a node is fixed, so the cumulative contribution
+vector of every node is precomputed once per artifact. An explanation then
+costs one `tree_.apply` per tree plus a table lookup. Contributions of
+one-hot/scaled columns are folded back onto the original `Passenger` fields.
+"""
+import numpy as np
+
+from anytime import AnytimeForest
+from model_manager import FEATURE_COLUMNS
+
+
+def original_feature_map(preprocess, original_columns):
+    """Matrix mapping transformed output columns onto original input columns"""
+    output_names = list(preprocess.get_feature_names_out())
+    by_length = sorted(enumerate(original_columns), key=lambda item: -len(item[1]))
+    mapping = np.zeros((len(output_names), len(original_columns)))
+    for i, name in enumerate(output_names):
+        # ColumnTransformer đặt tên dạng "<transformer>__<column>[_<category>]"
+        base = name.split("__", 1)[-1]
+        for j, column in by_length:
+            if base == column or base.startswith(column + "_"):
+                mapping[i, j] = 1.0
+                break
+        else:
+            raise ValueError(f"Cannot map transformed feature '{name}' to an input column")
+    return mapping
+
+
+class ExplanationResult:
+    __slots__ = ("predictions", "proba", "base_value", "contributions", "feature_names")
+
+    def __init__(self, predictions, proba, base_value, contributions, feature_names):
+        self.predictions = predictions
+        self.proba = proba
+        self.base_value = base_value
+        self.contributions = contributions
+        self.feature_names = feature_names
+
+    def contributions_for(self, row):
+        return {name: float(value) for name, value in zip(self.feature_names, self.contributions[row])}
+
+
+class ForestExplainer:
+    """Node-level contribution tables built once per model artifact"""
+
+    def __init__(self, model):
+        self.forest = AnytimeForest(model)
+        preprocess = self.forest.preprocess
+        if preprocess is not None:
+            self.feature_names = list(getattr(model, "feature_names_in_", FEATURE_COLUMNS))
+            mapping = original_feature_map(preprocess, self.feature_names)
+        else:
+            n_features = self.forest.trees[0].n_features
+            self.feature_names = list(getattr(model, "feature_names_in_", [f"x{i}" for i in range(n_features)]))
+            mapping = np.eye(n_features)
+
+        self.node_contributions = []
+        bias = 0.0
+        for tree, node_value in zip(self.forest.trees, self.forest.positive_leaf_proba):
+            contributions = np.zeros((tree.node_count, mapping.shape[0]))
+            left, right, feature = tree.children_left, tree.children_right, tree.feature
+            # Node id của con luôn lớn hơn của cha nên một lượt duyệt theo thứ tự là đủ
+            for node in range(tree.node_count):
+                for child in (left[node], right[node]):
+                    if child != -1:
+                        contributions[child] = contributions[node]
+                        contributions[child, feature[node]] += node_value[child] - node_value[node]
+            self.node_contributions.append(contributions @ mapping)
+            bias += node_value[0]
+        self.base_value = bias / len(self.forest.trees)
+
+    def explain(self, X):
+        Xt = self.forest.transform(X)
+        contributions = np.zeros((Xt.shape[0], len(self.feature_names)))
+        for tree, table in zip(self.forest.trees, self.node_contributions):
+            contributions += table[tree.apply(Xt)]
+        contributions /= len(self.forest.trees)
+        positive = self.base_value + contributions.sum(axis=1)
+        proba = np.column_stack([1.0 - positive, positive])
+        predictions = self.forest.classes[(positive > 0.5).astype(int)]
+        return ExplanationResult(predictions, proba, self.base_value, contributions, self.feature_names)
@@ -0,0 +1,222 @@
+"""Binary gRPC inference service running next to the HTTP API.
+
+Internal callers pay for HTTP/1.1 framing and the verbose JSON `/predict`
+response on every call. This service exposes the same prediction path over
+gRPC/HTTP2 with protobuf messages (proto/inference.proto), as a unary
+`Predict` and a bidirectional `PredictStream` that keeps one stream open for
+many passengers.
+
+The message classes are built at runtime from a descriptor that mirrors
+proto/inference.proto, so the server and the bundled client need no protoc
+step; grpcio and protobuf already come with the OTLP exporter. Validation,
+model access and telemetry are supplied by main.py through `predict_fn`.
+"""
+import logging
+import threading
+import time
+from concurrent import futures
+
+import grpc
+from google.protobuf import descriptor_pb2, descriptor_pool, message_factory
+
+logger = logging.getLogger(__name__)
+
+PACKAGE = "titanic.inference.v1"
+SERVICE = f"{PACKAGE}.Inference"
+PREDICT_METHOD = f"/{SERVICE}/Predict"
+PREDICT_STREAM_METHOD = f"/{SERVICE}/PredictStream"
+
+_F = descriptor_pb2.FieldDescriptorProto
+# Thứ tự trong list chính là field number, phải khớp với proto/inference.proto
+REQUEST_FIELDS = [
+    ("pclass", _F.TYPE_INT32),
+    ("sex", _F.TYPE_STRING),
+    ("age", _F.TYPE_DOUBLE),
+    ("sibsp", _F.TYPE_INT32),
+    ("parch", _F.TYPE_INT32),
+    ("fare", _F.TYPE_DOUBLE),
+    ("embarked", _F.TYPE_STRING),
+    ("request_id", _F.TYPE_UINT64),
+]
+REPLY_FIELDS = [
+    ("prediction", _F.TYPE_INT32),
+    ("survived_probability", _F.TYPE_DOUBLE),
+    ("confidence", _F.TYPE_DOUBLE),
+    ("model_version", _F.TYPE_STRING),
+    ("processing_time", _F.TYPE_DOUBLE),
+    ("request_id", _F.TYPE_UINT64),
+    ("trees_used", _F.TYPE_INT32),
+    ("code", _F.TYPE_INT32),
+    ("error", _F.TYPE_STRING),
+]
+
+
+def _build_messages():
+    file_proto = descriptor_pb2.FileDescriptorProto(
+        name="inference.proto", package=PACKAGE, syntax="proto3"
+    )
+    for name, fields in (("PredictRequest", REQUEST_FIELDS), ("PredictReply", REPLY_FIELDS)):
+        message = file_proto.message_type.add(name=name)
+        for number, (field_name, field_type) in enumerate(fields, start=1):
+            message.field.add(name=field_name, number=number, type=field_type, label=_F.LABEL_OPTIONAL)
+    # Pool riêng để không đụng descriptor của OTLP trong default pool
+    pool = descriptor_pool.DescriptorPool()
+    pool.AddSerializedFile(file_proto.SerializeToString())
+    return tuple(
+        message_factory.GetMessageClass(pool.FindMessageTypeByName(f"{PACKAGE}.{name}"))
+        for name in ("PredictRequest", "PredictReply")
+    )
+
+
+PredictRequest, PredictReply = _build_messages()
+
+
+def status_for(error):
+    """Map an exception from predict_fn to a gRPC status code"""
+    # pydantic.ValidationError cũng là ValueError
+    if isinstance(error, ValueError):
+        return grpc.StatusCode.INVALID_ARGUMENT
+    return grpc.StatusCode.INTERNAL
+
+
+class InferenceServer:
+    """gRPC server for the Inference service.
+
+    `predict_fn(request)` validates and scores one PredictRequest and returns
+    the reply fields as a dict; `ready_fn()` gates calls with UNAVAILABLE
+    while the model is loading; `on_call(method, code, duration)` is called
+    once per unary call or stream message for metrics.
+
+    The sync server runs each RPC on one of `workers` threads and an open
+    PredictStream keeps its thread until the client closes it. At most
+    `max_streams` streams (default half the workers) are accepted so unary
+    calls always have threads left; further streams, and any call beyond
+    `workers` in flight, fail fast with RESOURCE_EXHAUSTED instead of waiting
+    for a thread that may never free up.
+    """
+
+    def __init__(self, predict_fn, ready_fn=None, on_call=None, host="0.0.0.0", port=50051, workers=8,
+                 max_streams=None):
+        self.predict_fn = predict_fn
+        self.ready_fn = ready_fn
+        self.on_call = on_call
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.max_streams = max_streams if max_streams is not None else max(workers // 2, 1)
+        if not 0 < self.max_streams <= workers:
+            raise ValueError(f"max_streams must be between 1 and workers ({workers}), got {self.max_streams}")
+        self.active_streams = 0
+        self._streams_lock = threading.Lock()
+        self._server = None
+
+    def _score(self, request):
+        """Return (reply, status code, error message) for one request"""
+        if self.ready_fn is not None and not self.ready_fn():
+            return PredictReply(request_id=request.request_id), grpc.StatusCode.UNAVAILABLE, "Model is not ready yet"
+        try:
+            fields = self.predict_fn(request)
+            return PredictReply(request_id=request.request_id, **fields), grpc.StatusCode.OK, ""
+        except Exception as e:
+            return PredictReply(request_id=request.request_id), status_for(e), str(e)
+
+    def _record(self, method, code, started):
+        if self.on_call is not None:
+            try:
+                self.on_call(method, code.name, time.perf_counter() - started)
+            except Exception as e:
+                logger.error(f"❌ gRPC on_call callback failed: {e}")
+
+    def predict(self, request, context):
+        started = time.perf_counter()
+        reply, code, error = self._score(request)
+        self._record("Predict", code, started)
+        if code is not grpc.StatusCode.OK:
+            context.abort(code, error)
+        return reply
+
+    def predict_stream(self, request_iterator, context):
+        with self._streams_lock:
+            accepted = self.active_streams < self.max_streams
+            if accepted:
+                self.active_streams += 1
+        if not accepted:
+            self._record("PredictStream", grpc.StatusCode.RESOURCE_EXHAUSTED, time.perf_counter())
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED,
+                          f"Too many open streams (max {self.max_streams}), retry later or use Predict")
+        try:
+            yield from self._stream_replies(request_iterator)
+        finally:
+            with self._streams_lock:
+                self.active_streams -= 1
+
+    def _stream_replies(self, request_iterator):
+        # Lỗi của từng message nằm trong reply để stream không bị đóng
+        for request in request_iterator:
+            started = time.perf_counter()
+            reply, code, error = self._score(request)
+            if code is not grpc.StatusCode.OK:
+                reply.code = code.value[0]
+                reply.error = error
+            self._record("PredictStream", code, started)
+            yield reply
+
+    def start(self):
+        handler = grpc.method_handlers_generic_handler(SERVICE, {
+            "Predict": grpc.unary_unary_rpc_method_handler(
+                self.predict,
+                request_deserializer=PredictRequest.FromString,
+                response_serializer=PredictReply.SerializeToString,
+            ),
+            "PredictStream": grpc.stream_stream_rpc_method_handler(
+                self.predict_stream,
+                request_deserializer=PredictRequest.FromString,
+                response_serializer=PredictReply.SerializeToString,
+            ),
+        })
+        # maximum_concurrent_rpcs = workers: call vượt quá bị từ chối ngay thay vì xếp hàng
+        # sau các stream đang giữ thread
+        self._server = grpc.server(
+            futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="grpc-inference"),
+            maximum_concurrent_rpcs=self.workers,
+        )
+        self._server.add_generic_rpc_handlers((handler,))
+        self.port = self._server.add_insecure_port(f"{self.host}:{self.port}")
+        self._server.start()
+        return self.port
+
+    def stop(self, grace=5.0):
+        if self._server is None:
+            return
+        self._server.stop(grace).wait()
+        self._server = None
+
+
+class InferenceClient:
+    """Minimal client for the Inference service (used by scripts/grpc_benchmark.py)"""
+
+    def __init__(self, target, channel=None):
+        self.channel = channel or grpc.insecure_channel(target)
+        self._predict = self.channel.unary_unary(
+            PREDICT_METHOD,
+            request_serializer=PredictRequest.SerializeToString,
+            response_deserializer=PredictReply.FromString,
+        )
+        self._predict_stream = self.channel.stream_stream(
+            PREDICT_STREAM_METHOD,
+            request_serializer=PredictRequest.SerializeToString,
+            response_deserializer=PredictReply.FromString,
+        )
+
+    def predict(self, request, timeout=None):
+        return self._predict(request, timeout=timeout)
+
+    def predict_stream(self, requests, timeout=None):
+        """Send an iterator of PredictRequest, yield PredictReply in order"""
+        return self._predict_stream(requests, timeout=timeout)
+
+    def wait_ready(self, timeout=10.0):
+        grpc.channel_ready_future(self.channel).result(timeout=timeout)
+
+    def close(self):
+        self.channel.close()
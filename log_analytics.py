@@ -0,0 +1,358 @@
+"""Indexed queries over logs/app.log.
+
+Log lines look like JSON but the message is inserted unescaped by the
+logging format (prediction events even embed a JSON object), so records are
+parsed with a regex anchored on the fixed prefix/suffix. Lines that do not
+start a record (tracebacks) belong to the previous record.
+
+The file is read through mmap. A sidecar index (`app.log.idx`) splits it
+into blocks of BLOCK_RECORDS records. For each block it stores the byte range,
+the min/max timestamp and a bitmask of the event types it contains, so a
+time-range or event-type query only parses the blocks that can match.
+Re-indexing is incremental: only bytes appended after the indexed end are
+parsed, unless the file was truncated or replaced. Aggregations run as one
+numpy pass over the parsed columns.
+"""
+import json
+import mmap
+import os
+import re
+import struct
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+BLOCK_RECORDS = 256
+
+EVENT_TYPES = [
+    "startup",
+    "health",
+    "prediction",
+    "low_confidence",
+    "explanation",
+    "system_metrics",
+    "telemetry_export",
+    "error",
+    "warning",
+    "other",
+]
+EVENT_CODES = {name: code for code, name in enumerate(EVENT_TYPES)}
+LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+LEVEL_CODES = {name: code for code, name in enumerate(LEVELS)}
+
+RECORD_RE = re.compile(
+    r'^\{"timestamp": "(?P<ts>[^"]+)", "level": "(?P<level>\w+)", "message": "(?P<message>.*)", '
+    r'"service": "[^"]*"(?:, "version": "[^"]*")?\}$'
+)
+LEGACY_PREDICTION_RE = re.compile(
+    r"Prediction made: (?P<result>[^,]+), confidence: (?P<confidence>[\d.]+), processing_time: (?P<time>[\d.]+)s"
+)
+LOW_CONFIDENCE_RE = re.compile(r"Low confidence prediction: (?P<confidence>[\d.]+)")
+NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+STARTUP_MARKERS = (
+    "Starting ", "Startup", "Model loaded", "Service ready", "System health", "Shutting down",
+    "Final stats", "OpenTelemetry endpoint", "Lazy startup", "Model warm-up",
+)
+
+RECORD_START = b'{"timestamp": "'
+INDEX_MAGIC = b"TLIX"
+INDEX_VERSION = 2  # v2: ERROR/CRITICAL luôn được phân loại là error
+# magic, version, indexed end offset, inode, crc32 của 4KB đầu, số block
+HEADER = struct.Struct("<4sHQQII")
+# start offset, end offset, min ts, max ts, event type mask, record count
+BLOCK = struct.Struct("<QQddII")
+
+
+def parse_timestamp(text):
+    """Parse the logging asctime format '2025-06-09 12:31:58,358' to epoch seconds"""
+    return datetime(
+        int(text[0:4]), int(text[5:7]), int(text[8:10]),
+        int(text[11:13]), int(text[14:16]), int(text[17:19]), int(text[20:23]) * 1000,
+    ).timestamp()
+
+
+def classify(level, message):
+    # ERROR/CRITICAL trước heuristics theo message: "❌ Startup failed", "❌ Health check error"
+    # phải nằm trong --type error
+    if level in ("ERROR", "CRITICAL"):
+        return "error"
+    if message.startswith('{"event": "prediction_made"') or message.startswith("Prediction made:"):
+        return "prediction"
+    if message.startswith('{"event": "explanation_made"'):
+        return "explanation"
+    if "Low confidence prediction" in message:
+        return "low_confidence"
+    if "Health check" in message:
+        return "health"
+    if "System metrics" in message:
+        return "system_metrics"
+    if "exporting" in message and "Transient error" in message:
+        return "telemetry_export"
+    if any(marker in message for marker in STARTUP_MARKERS):
+        return "startup"
+    if level == "WARNING":
+        return "warning"
+    return "other"
+
+
+def iter_records(mm, start, end):
+    """Yield (offset, ts, level, message, extra lines) for complete records in [start, end)"""
+    current = None
+    pos = start
+    while pos < end:
+        newline = mm.find(b"\n", pos, end)
+        if newline == -1:
+            break
+        raw = mm[pos:newline]
+        if raw.startswith(RECORD_START):
+            match = RECORD_RE.match(raw.decode("utf-8", errors="replace").rstrip("\r"))
+            if match:
+                if current is not None:
+                    yield current
+                current = (pos, parse_timestamp(match.group("ts")), match.group("level"), match.group("message"), [])
+                pos = newline + 1
+                continue
+        if current is not None and raw.strip():
+            current[4].append(raw.decode("utf-8", errors="replace"))
+        pos = newline + 1
+    if current is not None:
+        yield current
+
+
+def complete_end(mm, size):
+    """Offset just past the last newline; a partially written line is left for later"""
+    last = mm.rfind(b"\n", 0, size)
+    return last + 1 if last != -1 else 0
+
+
+class LogIndex:
+    """Sidecar block index for one log file"""
+
+    def __init__(self, log_path, index_path=None):
+        self.log_path = log_path
+        self.index_path = index_path or log_path + ".idx"
+        self.indexed_end = 0
+        self.blocks = []
+
+    def _identity(self, f, length):
+        """Inode plus a checksum of the file's first bytes (max 4KB) to detect replacement"""
+        f.seek(0)
+        return os.fstat(f.fileno()).st_ino, zlib.crc32(f.read(min(length, 4096))) & 0xFFFFFFFF
+
+    def _load(self):
+        try:
+            with open(self.index_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if len(data) < HEADER.size:
+            return None
+        magic, version, indexed_end, inode, crc, count = HEADER.unpack_from(data, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION or len(data) != HEADER.size + count * BLOCK.size:
+            return None
+        blocks = [BLOCK.unpack_from(data, HEADER.size + i * BLOCK.size) for i in range(count)]
+        return indexed_end, inode, crc, blocks
+
+    def _save(self, inode, crc):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, self.indexed_end, inode, crc, len(self.blocks)))
+            for block in self.blocks:
+                f.write(BLOCK.pack(*block))
+        os.replace(tmp_path, self.index_path)
+
+    def refresh(self):
+        """Bring the index up to date; returns the number of newly indexed records"""
+        with open(self.log_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self.indexed_end, self.blocks = 0, []
+            stored = self._load()
+            if stored is not None:
+                indexed_end, stored_inode, stored_crc, blocks = stored
+                # Chỉ tái sử dụng khi cùng file và phần đã index không bị cắt ngắn/ghi đè
+                if indexed_end <= size and self._identity(f, indexed_end) == (stored_inode, stored_crc):
+                    self.indexed_end, self.blocks = indexed_end, blocks
+            if size == 0 or self.indexed_end >= size:
+                return 0
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                end = complete_end(mm, size)
+                added = self._index_range(mm, self.indexed_end, end)
+                self.indexed_end = max(self.indexed_end, end)
+            inode, crc = self._identity(f, self.indexed_end)
+        self._save(inode, crc)
+        return added
+
+    def _index_range(self, mm, start, end):
+        added = 0
+        block_start = None
+        min_ts = max_ts = 0.0
+        mask = count = 0
+        for offset, ts, level, message, _ in iter_records(mm, start, end):
+            if block_start is None:
+                block_start, min_ts, max_ts, mask, count = offset, ts, ts, 0, 0
+            min_ts, max_ts = min(min_ts, ts), max(max_ts, ts)
+            mask |= 1 << EVENT_CODES[classify(level, message)]
+            count += 1
+            added += 1
+            if count == BLOCK_RECORDS:
+                next_offset = mm.find(b"\n" + RECORD_START, offset, end)
+                block_end = next_offset + 1 if next_offset != -1 else end
+                self.blocks.append((block_start, block_end, min_ts, max_ts, mask, count))
+                block_start = None
+        if block_start is not None:
+            self.blocks.append((block_start, end, min_ts, max_ts, mask, count))
+        return added
+
+    def select_blocks(self, start_ts=None, end_ts=None, event_types=None):
+        wanted = 0
+        for name in event_types or []:
+            wanted |= 1 << EVENT_CODES[name]
+        selected = []
+        for block in self.blocks:
+            _, _, min_ts, max_ts, mask, _ = block
+            if start_ts is not None and max_ts < start_ts:
+                continue
+            if end_ts is not None and min_ts > end_ts:
+                continue
+            if wanted and not mask & wanted:
+                continue
+            selected.append(block)
+        return selected
+
+    @property
+    def last_timestamp(self):
+        return max((block[3] for block in self.blocks), default=None)
+
+
+def _prediction_fields(message):
+    """Return (result, confidence, processing_time, passenger_class) from a prediction message"""
+    if message.startswith("{"):
+        try:
+            data = json.loads(message)
+            return (data.get("result"), data.get("confidence", np.nan),
+                    data.get("processing_time", np.nan), data.get("passenger_class", -1))
+        except ValueError:
+            return None, np.nan, np.nan, -1
+    match = LEGACY_PREDICTION_RE.search(message)
+    if match:
+        return match.group("result"), float(match.group("confidence")), float(match.group("time")), -1
+    return None, np.nan, np.nan, -1
+
+
+def error_key(message, extra_lines):
+    """Group similar errors: numbers masked, final traceback line appended"""
+    key = NUMBER_RE.sub("N", message)[:120]
+    if extra_lines:
+        key += " | " + extra_lines[-1].strip()[:80]
+    return key
+
+
+def query(log_path, start_ts=None, end_ts=None, event_types=None, levels=None, index_path=None):
+    """Parse the matching records into column arrays"""
+    index = LogIndex(log_path, index_path)
+    index.refresh()
+    blocks = index.select_blocks(start_ts, end_ts, event_types)
+
+    ts, types, level_codes = [], [], []
+    confidence, processing_time, results, passenger_class, errors = [], [], [], [], []
+    if blocks:
+        with open(log_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for block_start, block_end, *_ in blocks:
+                for _, record_ts, level, message, extra in iter_records(mm, block_start, block_end):
+                    if start_ts is not None and record_ts < start_ts:
+                        continue
+                    if end_ts is not None and record_ts > end_ts:
+                        continue
+                    event_type = classify(level, message)
+                    if event_types and event_type not in event_types:
+                        continue
+                    if levels and level not in levels:
+                        continue
+                    result, conf, proc, pclass = None, np.nan, np.nan, -1
+                    if event_type == "prediction":
+                        result, conf, proc, pclass = _prediction_fields(message)
+                    elif event_type == "low_confidence":
+                        match = LOW_CONFIDENCE_RE.search(message)
+                        conf = float(match.group("confidence")) if match else np.nan
+                    ts.append(record_ts)
+                    types.append(EVENT_CODES[event_type])
+                    level_codes.append(LEVEL_CODES.get(level, LEVEL_CODES["INFO"]))
+                    confidence.append(conf)
+                    processing_time.append(proc)
+                    results.append(result)
+                    passenger_class.append(pclass)
+                    errors.append(error_key(message, extra) if level in ("ERROR", "CRITICAL") else None)
+
+    return {
+        "ts": np.array(ts, dtype=np.float64),
+        "type": np.array(types, dtype=np.int8),
+        "level": np.array(level_codes, dtype=np.int8),
+        "confidence": np.array(confidence, dtype=np.float64),
+        "processing_time": np.array(processing_time, dtype=np.float64),
+        "result": np.array(results, dtype=object),
+        "passenger_class": np.array(passenger_class, dtype=np.int16),
+        "error": np.array(errors, dtype=object),
+        "blocks_scanned": len(blocks),
+        "blocks_total": len(index.blocks),
+        "last_timestamp": index.last_timestamp,
+    }
+
+
+def _counts(values):
+    unique, counts = np.unique(values, return_counts=True)
+    return {str(value): int(count) for value, count in zip(unique, counts)}
+
+
+def aggregate(columns, percentiles=(50, 90, 99), low_confidence=0.6, top_errors=10):
+    """Counts, latency percentiles, low-confidence and error breakdowns"""
+    types = columns["type"]
+    is_prediction = types == EVENT_CODES["prediction"]
+    processing_time = columns["processing_time"][is_prediction]
+    processing_time = processing_time[~np.isnan(processing_time)]
+    confidence = columns["confidence"][is_prediction]
+    known_confidence = ~np.isnan(confidence)
+    low = is_prediction & (columns["confidence"] < low_confidence)
+
+    summary = {
+        "records": int(types.size),
+        "time_range": {
+            "start": datetime.fromtimestamp(columns["ts"].min()).isoformat() if types.size else None,
+            "end": datetime.fromtimestamp(columns["ts"].max()).isoformat() if types.size else None,
+        },
+        "blocks_scanned": columns["blocks_scanned"],
+        "blocks_total": columns["blocks_total"],
+        "by_event_type": {EVENT_TYPES[int(code)]: count for code, count in
+                          zip(*np.unique(types, return_counts=True))} if types.size else {},
+        "by_level": {LEVELS[int(code)]: count for code, count in
+                     zip(*np.unique(columns["level"], return_counts=True))} if types.size else {},
+        "predictions": {
+            "count": int(is_prediction.sum()),
+            "processing_time_seconds": {
+                f"p{p:g}": round(float(v), 4)
+                for p, v in zip(percentiles, np.percentile(processing_time, percentiles))
+            } if processing_time.size else {},
+            "mean_confidence": round(float(confidence[known_confidence].mean()), 4) if known_confidence.any() else None,
+            "by_result": _counts(columns["result"][is_prediction].astype(str)) if is_prediction.any() else {},
+        },
+        "low_confidence": {
+            "threshold": low_confidence,
+            "count": int(low.sum()),
+            "by_result": _counts(columns["result"][low].astype(str)) if low.any() else {},
+            "by_passenger_class": _counts(columns["passenger_class"][low]) if low.any() else {},
+            "warnings_logged": int((types == EVENT_CODES["low_confidence"]).sum()),
+        },
+    }
+    # Convert numpy ints from np.unique into plain ints for JSON output
+    summary["by_event_type"] = {k: int(v) for k, v in summary["by_event_type"].items()}
+    summary["by_level"] = {k: int(v) for k, v in summary["by_level"].items()}
+
+    error_mask = columns["error"] != None  # noqa: E711 - elementwise comparison on object array
+    if error_mask.any():
+        keys, counts = np.unique(columns["error"][error_mask].astype(str), return_counts=True)
+        order = np.argsort(-counts)[:top_errors]
+        summary["errors"] = {"count": int(error_mask.sum()),
+                             "top": [{"message": keys[i], "count": int(counts[i])} for i in order]}
+    else:
+        summary["errors"] = {"count": 0, "top": []}
+    return summary
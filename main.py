@@ -1,52 +1,95 @@
-from fastapi import FastAPI, HTTPException
+import time
+_import_start = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
-import joblib
-import pandas as pd
 import os
-import time
 import random
 import logging
+import threading
 from datetime import datetime
-import requests
 import json
 import syslog
-from typing import Dict, Any
+from typing import Dict, Any, List
 
-# OpenTelemetry imports
+# OpenTelemetry imports (SDK và OTLP exporters được import trong setup_telemetry)
 from opentelemetry import trace, metrics
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from opentelemetry.instrumentation.requests import RequestsInstrumentor
-from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
-from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.sdk.metrics import MeterProvider
-from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
-from opentelemetry.sdk.resources import Resource
 from opentelemetry.metrics import Observation
 import psutil
 
+from capture import TrafficCapture
+from model_manager import ModelManager, WARMUP_ROWS, warm_up
+from shadow import ShadowScorer
+from drift import DriftMonitor, profile_path_for
+
 # Environment variables
 OTEL_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://signoz-otel-collector:4317")
 SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "titanic-api")
 SERVICE_VERSION = os.getenv("OTEL_SERVICE_VERSION", "1.0.0")
+LOG_DIR = os.getenv("LOG_DIR", "/app/logs")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "true").lower() == "true"
+SYSLOG_ENABLED = os.getenv("SYSLOG_ENABLED", "true").lower() == "true"
+# eager: load mọi thứ lúc import; lazy: telemetry, model và warm-up chạy nền sau khi server start
+STARTUP_MODE = os.getenv("STARTUP_MODE", "eager").lower()
+MODEL_MMAP_MODE = os.getenv("MODEL_MMAP_MODE") or None
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+MODEL_PATH = os.getenv("MODEL_PATH", "best_rf_model.pkl")
+MODEL_DIR = os.getenv("MODEL_DIR") or None  # thư mục version: <version>.pkl hoặc <version>/best_rf_model.pkl
+MODEL_WATCH_ENABLED = os.getenv("MODEL_WATCH_ENABLED", "false").lower() == "true"
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "10"))
+MODEL_HOLDOUT_PATH = os.getenv("MODEL_HOLDOUT_PATH") or None
+MODEL_MAX_LATENCY_MS = float(os.getenv("MODEL_MAX_LATENCY_MS", "50"))
+MODEL_MIN_ACCURACY = float(os.getenv("MODEL_MIN_ACCURACY", "0.7"))
+# Khi không có MODEL_HOLDOUT_PATH (không có label): tỉ lệ prediction trùng với model đang chạy
+MODEL_MIN_AGREEMENT = float(os.getenv("MODEL_MIN_AGREEMENT", "0.8"))
+# full: đánh giá mọi cây; anytime: dừng sớm khi kết quả đã chắc chắn hoặc hết latency budget
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "full").lower()
+ANYTIME_BUDGET_MS = float(os.getenv("ANYTIME_BUDGET_MS", "5"))
+ANYTIME_CONFIDENCE_Z = float(os.getenv("ANYTIME_CONFIDENCE_Z", "2.58"))
+ANYTIME_MIN_TREES = int(os.getenv("ANYTIME_MIN_TREES", "10"))
+ANYTIME_BATCH_TREES = int(os.getenv("ANYTIME_BATCH_TREES", "8"))
+EXPLAIN_ENABLED = os.getenv("EXPLAIN_ENABLED", "true").lower() == "true"
+EXPLAIN_MAX_BATCH = int(os.getenv("EXPLAIN_MAX_BATCH", "1000"))
+DRIFT_ENABLED = os.getenv("DRIFT_ENABLED", "true").lower() == "true"
+DRIFT_INTERVAL = float(os.getenv("DRIFT_INTERVAL", "60"))
+DRIFT_DECAY = float(os.getenv("DRIFT_DECAY", "0.5"))
+SHADOW_MODEL_PATH = os.getenv("SHADOW_MODEL_PATH") or None  # candidate model chạy shadow
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))
+SHADOW_WORKERS = int(os.getenv("SHADOW_WORKERS", "2"))
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "1000"))
+# gRPC inference service (proto/inference.proto) chạy song song với HTTP
+GRPC_ENABLED = os.getenv("GRPC_ENABLED", "false").lower() == "true"
+GRPC_PORT = int(os.getenv("GRPC_PORT", "50051"))
+GRPC_WORKERS = int(os.getenv("GRPC_WORKERS", "8"))
+# Mỗi PredictStream đang mở giữ một worker; mặc định tối đa một nửa số worker cho stream
+GRPC_MAX_STREAMS = int(os.getenv("GRPC_MAX_STREAMS", str(max(GRPC_WORKERS // 2, 1))))
+CAPTURE_ENABLED = os.getenv("CAPTURE_ENABLED", "false").lower() == "true"
+CAPTURE_SAMPLE_RATE = float(os.getenv("CAPTURE_SAMPLE_RATE", "0.1"))
+CAPTURE_DIR = os.getenv("CAPTURE_DIR", os.path.join(LOG_DIR, "capture"))
+CAPTURE_MAX_BYTES = int(os.getenv("CAPTURE_MAX_BYTES", str(50 * 1024 * 1024)))
+CAPTURE_BACKUP_COUNT = int(os.getenv("CAPTURE_BACKUP_COUNT", "10"))
 
 # Create logs directory
-os.makedirs('/app/logs', exist_ok=True)
+os.makedirs(LOG_DIR, exist_ok=True)
 
 # Configure syslog logging (if available)
-try:
-    syslog.openlog("titanic-api", syslog.LOG_PID, syslog.LOG_USER)
-    SYSLOG_AVAILABLE = True
-except:
-    SYSLOG_AVAILABLE = False
+SYSLOG_AVAILABLE = False
+if SYSLOG_ENABLED:
+    try:
+        syslog.openlog("titanic-api", syslog.LOG_PID, syslog.LOG_USER)
+        SYSLOG_AVAILABLE = True
+    except:
+        SYSLOG_AVAILABLE = False
 
 # Configure logging với JSON format cho SigNoz
 logging.basicConfig(
-    level=logging.INFO,
+    level=getattr(logging, LOG_LEVEL, logging.INFO),
     format='{"timestamp": "%(asctime)s", "level": "%(levelname)s", "message": "%(message)s", "service": "' + SERVICE_NAME + '", "version": "' + SERVICE_VERSION + '"}',
     handlers=[
-        logging.FileHandler('/app/logs/app.log'),
+        logging.FileHandler(os.path.join(LOG_DIR, 'app.log')),
         logging.StreamHandler()  # stdout logs
     ]
 )
@@ -60,34 +103,72 @@ def log_to_syslog(message, priority=syslog.LOG_INFO):
         except:
             pass
 
-# Configure OpenTelemetry
-resource = Resource.create({
-    "service.name": SERVICE_NAME, 
-    "service.version": SERVICE_VERSION,
-    "deployment.environment": "development"
-})
-
-# Tracing setup
-trace.set_tracer_provider(TracerProvider(resource=resource))
-tracer_provider = trace.get_tracer_provider()
-otlp_exporter = OTLPSpanExporter(
-    endpoint=OTEL_ENDPOINT,
-    insecure=True,
-)
-span_processor = BatchSpanProcessor(otlp_exporter)
-tracer_provider.add_span_processor(span_processor)
-
-# Metrics setup
-metric_reader = PeriodicExportingMetricReader(
-    OTLPMetricExporter(
+# Startup state: readiness chỉ true sau khi telemetry, model và warm-up xong
+startup_state = {
+    "ready": False,
+    "error": None,
+    "phases": {},
+}
+
+def record_startup_phase(name, started):
+    duration = time.perf_counter() - started
+    startup_state["phases"][name] = round(duration, 4)
+    phase_message = f"⏱️ Startup phase '{name}' took {duration:.3f}s"
+    logger.info(phase_message)
+    log_to_syslog(phase_message)
+
+record_startup_phase("imports", _import_start)
+
+def setup_telemetry():
+    """Configure OpenTelemetry SDK providers and OTLP exporters.
+
+    Tracer/meter/instrument được tạo trước đó từ API proxy sẽ tự gắn vào
+    provider thật khi hàm này chạy, nên có thể gọi muộn (STARTUP_MODE=lazy).
+    TELEMETRY_ENABLED=false giữ provider no-op mặc định.
+    """
+    if not TELEMETRY_ENABLED:
+        return
+    from opentelemetry.instrumentation.requests import RequestsInstrumentor
+    from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+    from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+    from opentelemetry.sdk.resources import Resource
+
+    resource = Resource.create({
+        "service.name": SERVICE_NAME,
+        "service.version": SERVICE_VERSION,
+        "deployment.environment": "development"
+    })
+
+    # Tracing setup
+    trace.set_tracer_provider(TracerProvider(resource=resource))
+    otlp_exporter = OTLPSpanExporter(
         endpoint=OTEL_ENDPOINT,
         insecure=True,
-    ),
-    export_interval_millis=5000,  # 5 seconds for faster updates
-)
-metrics.set_meter_provider(MeterProvider(resource=resource, metric_readers=[metric_reader]))
+    )
+    span_processor = BatchSpanProcessor(otlp_exporter)
+    trace.get_tracer_provider().add_span_processor(span_processor)
+
+    # Metrics setup
+    metric_reader = PeriodicExportingMetricReader(
+        OTLPMetricExporter(
+            endpoint=OTEL_ENDPOINT,
+            insecure=True,
+        ),
+        export_interval_millis=5000,  # 5 seconds for faster updates
+    )
+    metrics.set_meter_provider(MeterProvider(resource=resource, metric_readers=[metric_reader]))
+    RequestsInstrumentor().instrument()
 
-# Get tracer and meter
+if STARTUP_MODE != "lazy":
+    telemetry_start = time.perf_counter()
+    setup_telemetry()
+    record_startup_phase("telemetry", telemetry_start)
+
+# Get tracer and meter (proxy cho tới khi setup_telemetry chạy)
 tracer = trace.get_tracer(__name__)
 meter = metrics.get_meter(__name__)
 
@@ -126,6 +207,18 @@ http_errors_total = meter.create_counter(
     description="Total HTTP errors",
 )
 
+# gRPC metrics (unary call hoặc từng message trong stream)
+grpc_requests_total = meter.create_counter(
+    name="grpc_requests_total",
+    description="Total gRPC inference calls and stream messages",
+)
+
+grpc_request_duration = meter.create_histogram(
+    name="grpc_request_duration_seconds",
+    description="gRPC inference call duration",
+    unit="s",
+)
+
 # System metrics callbacks với error handling
 def get_cpu_usage(options):
     try:
@@ -242,6 +335,7 @@ request_count = 0
 error_count = 0
 recent_predictions = []
 service_start_time = time.time()
+inference_server = None
 
 def get_current_error_rate():
     global request_count, error_count
@@ -304,6 +398,137 @@ model_avg_confidence_gauge = meter.create_observable_gauge(
     callbacks=[get_avg_confidence]
 )
 
+def get_startup_phases(options):
+    try:
+        return [Observation(duration, {"phase": phase}) for phase, duration in startup_state["phases"].items()]
+    except Exception as e:
+        logger.error(f"Error getting startup phases: {e}")
+        return []
+
+startup_phase_gauge = meter.create_observable_gauge(
+    name="startup_phase_duration_seconds",
+    description="Duration of each startup phase (imports, telemetry, model_load, warmup)",
+    unit="s",
+    callbacks=[get_startup_phases]
+)
+
+drift_monitor = DriftMonitor(decay=DRIFT_DECAY) if DRIFT_ENABLED else None
+
+def get_drift_scores(metric):
+    def callback(options):
+        try:
+            if drift_monitor is None:
+                return []
+            return [
+                Observation(scores[metric], {"feature": feature})
+                for feature, scores in drift_monitor.scores.items()
+            ]
+        except Exception as e:
+            logger.error(f"Error getting drift {metric}: {e}")
+            return []
+    return callback
+
+feature_drift_psi_gauge = meter.create_observable_gauge(
+    name="feature_drift_psi",
+    description="Population stability index of each input feature against the model's reference profile",
+    unit="1",
+    callbacks=[get_drift_scores("psi")]
+)
+
+feature_drift_kl_gauge = meter.create_observable_gauge(
+    name="feature_drift_kl_divergence",
+    description="KL divergence of each input feature against the model's reference profile",
+    unit="1",
+    callbacks=[get_drift_scores("kl")]
+)
+
+traffic_capture = TrafficCapture(
+    CAPTURE_DIR,
+    max_bytes=CAPTURE_MAX_BYTES,
+    backup_count=CAPTURE_BACKUP_COUNT,
+) if CAPTURE_ENABLED else None
+
+def get_capture_dropped(options):
+    try:
+        return [Observation(traffic_capture.dropped if traffic_capture else 0)]
+    except Exception as e:
+        logger.error(f"Error getting capture drops: {e}")
+        return [Observation(0)]
+
+capture_dropped_counter = meter.create_observable_counter(
+    name="traffic_capture_dropped_total",
+    description="Captured requests dropped because the write queue was full",
+    callbacks=[get_capture_dropped]
+)
+
+model_reloads_total = meter.create_counter(
+    name="model_reloads_total",
+    description="Model hot-reload attempts by result (swapped, rejected)",
+)
+
+model_inference_duration = meter.create_histogram(
+    name="model_inference_duration_seconds",
+    description="Model inference time per prediction, by model role (primary, shadow) and version",
+    unit="s",
+)
+
+anytime_trees_evaluated = meter.create_histogram(
+    name="anytime_trees_evaluated",
+    description="Trees evaluated per prediction in anytime inference mode",
+    unit="1",
+)
+
+explanation_duration = meter.create_histogram(
+    name="explanation_duration_seconds",
+    description="Time spent computing feature contributions for /predict/explain",
+    unit="s",
+)
+
+anytime_exits_total = meter.create_counter(
+    name="anytime_exits_total",
+    description="Anytime predictions by stop reason (complete, settled, budget)",
+)
+
+shadow_predictions_total = meter.create_counter(
+    name="shadow_predictions_total",
+    description="Shadow predictions scored, by candidate version and agreement with the primary model",
+)
+
+shadow_probability_delta = meter.create_histogram(
+    name="shadow_probability_delta",
+    description="Absolute difference in survival probability between shadow and primary model",
+    unit="1",
+)
+
+def get_shadow_disagreement_rate(options):
+    try:
+        if shadow_scorer is None or shadow_scorer.manager.current is None:
+            return []
+        return [Observation(shadow_scorer.disagreement_rate, {"model_version": shadow_scorer.manager.current.version})]
+    except Exception as e:
+        logger.error(f"Error getting shadow disagreement rate: {e}")
+        return []
+
+def get_shadow_dropped(options):
+    try:
+        return [Observation(shadow_scorer.dropped if shadow_scorer else 0)]
+    except Exception as e:
+        logger.error(f"Error getting shadow drops: {e}")
+        return [Observation(0)]
+
+shadow_disagreement_gauge = meter.create_observable_gauge(
+    name="shadow_disagreement_rate",
+    description="Fraction of shadow predictions that disagree with the primary model",
+    unit="1",
+    callbacks=[get_shadow_disagreement_rate]
+)
+
+shadow_dropped_counter = meter.create_observable_counter(
+    name="shadow_dropped_total",
+    description="Shadow samples dropped because the shadow queue was full",
+    callbacks=[get_shadow_dropped]
+)
+
 low_confidence_counter = meter.create_counter(
     name="low_confidence_predictions",
     description="Number of predictions with confidence < 0.6",
@@ -326,14 +551,23 @@ async def startup_event():
     logger.info(startup_message)
     log_to_syslog(startup_message)
     logger.info(f"📡 OpenTelemetry endpoint: {OTEL_ENDPOINT}")
+    if traffic_capture:
+        traffic_capture.start()
+        logger.info(f"🎥 Traffic capture enabled - sample rate {CAPTURE_SAMPLE_RATE}, dir {CAPTURE_DIR}")
+    if GRPC_ENABLED:
+        start_grpc_server()
     try:
-        cpu_percent = psutil.cpu_percent(interval=1)
+        # interval=None không block; lần gọi đầu chỉ khởi tạo mốc đo CPU
+        cpu_percent = psutil.cpu_percent(interval=None)
         memory_percent = psutil.virtual_memory().percent
         disk_percent = psutil.disk_usage('/').percent
         health_message = f"💻 System health - CPU: {cpu_percent}%, Memory: {memory_percent}%, Disk: {disk_percent}%"
         logger.info(health_message)
         log_to_syslog(health_message)
-        if 'model' in globals():
+        if STARTUP_MODE == "lazy":
+            threading.Thread(target=run_startup_phases, name="startup", daemon=True).start()
+            logger.info("⏳ Lazy startup - telemetry, model load and warm-up running in background")
+        elif model_manager.current is not None:
             model_message = "🤖 ML Model loaded successfully"
             logger.info(model_message)
             log_to_syslog(model_message)
@@ -357,28 +591,180 @@ async def shutdown_event():
     stats_message = f"📊 Final stats - Requests: {request_count}, Errors: {error_count}, Uptime: {uptime:.1f}s, Avg RPS: {avg_rps:.2f}"
     logger.info(stats_message)
     log_to_syslog(stats_message)
+    if inference_server:
+        inference_server.stop()
+    model_manager.stop_watching()
+    if drift_monitor:
+        drift_monitor.stop()
+    if shadow_scorer:
+        shadow_scorer.stop()
+        logger.info(f"👥 Shadow scoring stopped - compared: {shadow_scorer.compared}, disagreements: {shadow_scorer.disagreements}, dropped: {shadow_scorer.dropped}")
+    if traffic_capture:
+        traffic_capture.stop()
+        logger.info(f"🎥 Traffic capture stopped - written: {traffic_capture.written}, dropped: {traffic_capture.dropped}")
+
+if TELEMETRY_ENABLED:
+    # Không truyền tracer_provider: dùng global proxy để lazy mode set provider sau
+    FastAPIInstrumentor.instrument_app(app)
+
+def on_model_reload(result, version, report):
+    # ModelManager đã tự log chi tiết; ở đây chỉ cần metric và syslog
+    model_reloads_total.add(1, {"result": result, "model_version": version})
+    if result == "swapped":
+        log_to_syslog(f"Model hot-reloaded to version {version}")
+        if drift_monitor:
+            load_drift_profile(model_manager.current.path)
+    else:
+        log_to_syslog(f"Model version {version} rejected: {report.get('error')}", syslog.LOG_ERR)
+
+# Cấu trúc precompute theo từng artifact, được build lúc load và swap cùng model.
+# Import trong hàm để numpy/sklearn không bị load lúc import ở lazy mode.
+def prepare_anytime(model):
+    from anytime import AnytimeForest
+    return AnytimeForest(model)
+
+def prepare_explainer(model):
+    from explain import ForestExplainer
+    return ForestExplainer(model)
+
+model_preparers = {}
+if INFERENCE_MODE == "anytime":
+    model_preparers["anytime"] = prepare_anytime
+if EXPLAIN_ENABLED:
+    model_preparers["explain"] = prepare_explainer
+
+model_manager = ModelManager(
+    MODEL_PATH,
+    model_dir=MODEL_DIR,
+    mmap_mode=MODEL_MMAP_MODE,
+    warmup=WARMUP_ENABLED,
+    holdout_path=MODEL_HOLDOUT_PATH,
+    max_latency_ms=MODEL_MAX_LATENCY_MS,
+    min_accuracy=MODEL_MIN_ACCURACY,
+    min_agreement=MODEL_MIN_AGREEMENT,
+    on_reload=on_model_reload,
+    preparers=model_preparers,
+)
+pd = None  # pandas được import cùng lúc load model
 
-FastAPIInstrumentor.instrument_app(app, tracer_provider=tracer_provider)
-RequestsInstrumentor().instrument()
+def on_shadow_result(version, duration, agreed, probability_delta):
+    model_inference_duration.record(duration, {"model_role": "shadow", "model_version": version})
+    shadow_predictions_total.add(1, {"model_version": version, "agreement": str(agreed).lower()})
+    shadow_probability_delta.record(probability_delta, {"model_version": version})
 
-MODEL_PATH = "best_rf_model.pkl"
+shadow_scorer = ShadowScorer(
+    ModelManager(SHADOW_MODEL_PATH, mmap_mode=MODEL_MMAP_MODE),
+    sample_rate=SHADOW_SAMPLE_RATE,
+    workers=SHADOW_WORKERS,
+    queue_size=SHADOW_QUEUE_SIZE,
+    on_result=on_shadow_result,
+) if SHADOW_MODEL_PATH else None
 
-if not os.path.exists(MODEL_PATH):
-    error_message = f"❌ Model file '{MODEL_PATH}' not found"
-    logger.error(error_message)
-    log_to_syslog(error_message, syslog.LOG_ERR)
-    raise RuntimeError(f"Model file '{MODEL_PATH}' not found")
+def load_shadow_model():
+    """Load the candidate model; failures disable shadow scoring instead of startup"""
+    global shadow_scorer
+    try:
+        candidate = shadow_scorer.manager.load_initial()
+        if WARMUP_ENABLED:
+            warm_up(candidate.model)
+        shadow_scorer.start()
+        shadow_message = f"👥 Shadow model {candidate.version} loaded from {candidate.path}, sample rate {SHADOW_SAMPLE_RATE}"
+        logger.info(shadow_message)
+        log_to_syslog(shadow_message)
+    except Exception as e:
+        error_message = f"❌ Could not load shadow model, shadow scoring disabled: {e}"
+        logger.error(error_message)
+        log_to_syslog(error_message, syslog.LOG_ERR)
+        shadow_scorer = None
 
-try:
-    model = joblib.load(MODEL_PATH)
-    success_message = f"✅ Model loaded successfully from {MODEL_PATH}"
-    logger.info(success_message)
-    log_to_syslog(success_message)
-except Exception as e:
-    error_message = f"❌ Could not load model: {e}"
-    logger.error(error_message)
-    log_to_syslog(error_message, syslog.LOG_ERR)
-    raise RuntimeError(f"Could not load model: {e}")
+def load_model():
+    """Import pandas/sklearn and load the model artifact once"""
+    global pd
+    try:
+        model_path, _ = model_manager.resolve_path()
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Model file '{model_path}' not found")
+    except OSError as e:
+        error_message = f"❌ {e}"
+        logger.error(error_message)
+        log_to_syslog(error_message, syslog.LOG_ERR)
+        raise RuntimeError(str(e))
+
+    try:
+        import pandas
+        pd = pandas
+        active = model_manager.load_initial()
+        success_message = f"✅ Model loaded successfully from {active.path} (version {active.version})"
+        logger.info(success_message)
+        log_to_syslog(success_message)
+    except Exception as e:
+        error_message = f"❌ Could not load model: {e}"
+        logger.error(error_message)
+        log_to_syslog(error_message, syslog.LOG_ERR)
+        raise RuntimeError(f"Could not load model: {e}")
+
+def load_drift_profile(model_path):
+    """Load the reference profile stored next to the model and start the recompute thread"""
+    profile_path = profile_path_for(model_path)
+    if not os.path.exists(profile_path):
+        # Không giữ profile của model cũ: so sánh với reference sai còn tệ hơn không đo
+        drift_monitor.clear()
+        logger.warning(f"⚠️ No drift profile at {profile_path}, drift monitoring inactive")
+        return False
+    try:
+        drift_monitor.load_profile(profile_path)
+        drift_monitor.start(DRIFT_INTERVAL)
+        logger.info(f"📐 Drift profile loaded from {profile_path}")
+        return True
+    except Exception as e:
+        drift_monitor.clear()
+        error_message = f"❌ Could not load drift profile {profile_path}: {e}"
+        logger.error(error_message)
+        log_to_syslog(error_message, syslog.LOG_ERR)
+        return False
+
+def warm_up_model():
+    """Run synthetic predictions over every Pclass/Sex/Embarked combination"""
+    warm_up(model_manager.current.model)
+    logger.info(f"🔥 Model warm-up done with {len(WARMUP_ROWS)} synthetic passengers")
+
+def run_startup_phases():
+    """Telemetry (lazy mode), model load and warm-up, then mark the service ready"""
+    try:
+        if STARTUP_MODE == "lazy":
+            phase_start = time.perf_counter()
+            setup_telemetry()
+            record_startup_phase("telemetry", phase_start)
+        phase_start = time.perf_counter()
+        load_model()
+        record_startup_phase("model_load", phase_start)
+        if WARMUP_ENABLED:
+            phase_start = time.perf_counter()
+            warm_up_model()
+            record_startup_phase("warmup", phase_start)
+        if shadow_scorer:
+            phase_start = time.perf_counter()
+            load_shadow_model()
+            record_startup_phase("shadow_load", phase_start)
+        if drift_monitor:
+            load_drift_profile(model_manager.current.path)
+        startup_state["ready"] = True
+        if MODEL_WATCH_ENABLED:
+            model_manager.start_watching(MODEL_WATCH_INTERVAL)
+            logger.info(f"👀 Watching {MODEL_DIR or MODEL_PATH} for new model versions every {MODEL_WATCH_INTERVAL}s")
+        ready_message = f"✅ Service ready - startup phases: {startup_state['phases']}"
+        logger.info(ready_message)
+        log_to_syslog(ready_message)
+    except Exception as e:
+        startup_state["error"] = str(e)
+        error_message = f"❌ Startup failed: {e}"
+        logger.error(error_message)
+        log_to_syslog(error_message, syslog.LOG_ERR)
+        if STARTUP_MODE != "lazy":
+            raise
+
+if STARTUP_MODE != "lazy":
+    run_startup_phases()
 
 class Passenger(BaseModel):
     Pclass: int = Field(..., ge=1, le=3, description="Passenger class (1, 2, or 3)")
@@ -389,6 +775,43 @@ class Passenger(BaseModel):
     Fare: float = Field(..., ge=0, description="Passenger fare")
     Embarked: str = Field(..., description="Port of embarkation (C, Q, or S)")
 
+def passenger_to_row(passenger):
+    """Validate categorical fields and build the model input row"""
+    if passenger.Sex.lower() not in ['male', 'female']:
+        raise ValueError("Sex must be 'male' or 'female'")
+    if passenger.Embarked.upper() not in ['C', 'Q', 'S']:
+        raise ValueError("Embarked must be 'C', 'Q', or 'S'")
+    # Truyền đúng các cột gốc, không one-hot
+    return {
+        'Pclass': passenger.Pclass,
+        'Sex': passenger.Sex.lower(),
+        'Age': passenger.Age,
+        'SibSp': passenger.SibSp,
+        'Parch': passenger.Parch,
+        'Fare': passenger.Fare,
+        'Embarked': passenger.Embarked.upper()
+    }
+
+async def capture_request(request, body, response, arrival_time):
+    """Queue a sampled request/response pair for the capture writer"""
+    response_body = b"".join([chunk async for chunk in response.body_iterator])
+    # Body giữ dạng bytes, writer thread mới decode JSON
+    traffic_capture.submit({
+        "ts": arrival_time,
+        "method": request.method,
+        "path": request.url.path,
+        "query": request.url.query,
+        "body": body,
+        "status": response.status_code,
+        "duration": time.time() - arrival_time,
+        "response": response_body,
+    })
+    # body_iterator đã bị đọc hết nên trả về response mới với cùng nội dung
+    replayed = Response(content=response_body, status_code=response.status_code)
+    # raw_headers giữ header lặp lại (Set-Cookie) và content-length gốc
+    replayed.raw_headers = list(response.raw_headers)
+    return replayed
+
 @app.middleware("http")
 async def track_requests(request, call_next):
     global request_count, error_count
@@ -398,8 +821,18 @@ async def track_requests(request, call_next):
         "method": request.method,
         "endpoint": request.url.path
     })
+    capture_body = None
+    capturing = traffic_capture is not None and random.random() < CAPTURE_SAMPLE_RATE
+    if capturing:
+        capture_body = await request.body()
+        # Starlette 0.27 không tự replay body đã đọc cho endpoint phía sau
+        async def receive():
+            return {"type": "http.request", "body": capture_body, "more_body": False}
+        request._receive = receive
     try:
         response = await call_next(request)
+        if capturing:
+            response = await capture_request(request, capture_body, response, request_start_time)
         duration = time.time() - request_start_time
         http_request_duration.record(duration, {
             "method": request.method,
@@ -439,17 +872,48 @@ def root():
         "version": SERVICE_VERSION,
         "monitoring": {
             "syslog": SYSLOG_AVAILABLE,
-            "tracing": True,
-            "metrics": True
+            "tracing": TELEMETRY_ENABLED,
+            "metrics": TELEMETRY_ENABLED
         },
         "endpoints": {
             "predict": "/predict",
+            "explain": "/predict/explain",
+            "explain_batch": "/predict/explain/batch",
             "health": "/health",
+            "liveness": "/health/live",
+            "readiness": "/health/ready",
             "docs": "/docs",
-            "metrics": "/metrics/system"
+            "metrics": "/metrics/system",
+            "drift": "/metrics/drift"
+        },
+        "grpc": {
+            "enabled": GRPC_ENABLED,
+            "port": inference_server.port if inference_server else None,
+            "service": "titanic.inference.v1.Inference"
         }
     }
 
+@app.get("/health/live")
+def liveness_check():
+    """Liveness: process is up and startup has not failed"""
+    if startup_state["error"]:
+        return JSONResponse(status_code=503, content={"status": "failed", "error": startup_state["error"]})
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def readiness_check():
+    """Readiness: model loaded and warmed up, safe to route traffic"""
+    body = {
+        "status": "ready" if startup_state["ready"] else "starting",
+        "startup_mode": STARTUP_MODE,
+        "phases": startup_state["phases"],
+    }
+    if startup_state["error"]:
+        body.update(status="failed", error=startup_state["error"])
+    if not startup_state["ready"]:
+        return JSONResponse(status_code=503, content=body)
+    return body
+
 @app.get("/health")
 def health_check():
     global request_count, error_count, service_start_time
@@ -492,7 +956,8 @@ def health_check():
                     "requests_per_second": round(rps, 2)
                 },
                 "model": {
-                    "status": "loaded",
+                    "status": "loaded" if startup_state["ready"] else "starting",
+                    "version": model_manager.current.version if model_manager.current else None,
                     "recent_predictions": len(recent_predictions)
                 },
                 "logging": {
@@ -517,43 +982,74 @@ def health_check():
                 "service": SERVICE_NAME
             }
 
-@app.post("/predict")
-def predict(passenger: Passenger):
+def score_passenger(passenger, transport):
+    """Shared prediction path for /predict and gRPC: validation, inference, metrics and logs.
+
+    Lỗi được log và gắn vào span ở đây rồi raise lại; caller đổi sang
+    HTTP status hoặc gRPC status code.
+    """
     global recent_predictions
+    # Giữ reference cho cả request: hot-reload không đổi model giữa chừng
+    active_model = model_manager.current
     with tracer.start_as_current_span("prediction") as span:
         prediction_start_time = time.time()
+        span.set_attribute("model.version", active_model.version)
+        span.set_attribute("prediction.transport", transport)
         try:
-            if passenger.Sex.lower() not in ['male', 'female']:
-                raise ValueError("Sex must be 'male' or 'female'")
-            if passenger.Embarked.upper() not in ['C', 'Q', 'S']:
-                raise ValueError("Embarked must be 'C', 'Q', or 'S'")
+            input_data = passenger_to_row(passenger)
             span.set_attribute("passenger.class", passenger.Pclass)
             span.set_attribute("passenger.sex", passenger.Sex)
             span.set_attribute("passenger.age", passenger.Age)
             span.set_attribute("passenger.fare", passenger.Fare)
-            # Truyền đúng các cột gốc, không one-hot
-            input_data = {
-                'Pclass': passenger.Pclass,
-                'Sex': passenger.Sex.lower(),
-                'Age': passenger.Age,
-                'SibSp': passenger.SibSp,
-                'Parch': passenger.Parch,
-                'Fare': passenger.Fare,
-                'Embarked': passenger.Embarked.upper()
-            }
+            if drift_monitor:
+                drift_monitor.update(input_data)
             X = pd.DataFrame([input_data])
-            pred = model.predict(X)[0]
-            pred_proba = model.predict_proba(X)[0]
+            inference_start = time.perf_counter()
+            anytime_forest = active_model.extras.get("anytime")
+            inference_info = None
+            if anytime_forest is not None:
+                anytime_result = anytime_forest.predict(
+                    X,
+                    budget_seconds=ANYTIME_BUDGET_MS / 1000,
+                    z=ANYTIME_CONFIDENCE_Z,
+                    min_trees=ANYTIME_MIN_TREES,
+                    batch_trees=ANYTIME_BATCH_TREES,
+                )
+                pred = anytime_result.predictions[0]
+                pred_proba = anytime_result.proba[0]
+                inference_info = {
+                    "mode": "anytime",
+                    "trees_used": anytime_result.trees_used,
+                    "trees_total": anytime_result.trees_total,
+                    "exact": anytime_result.exact,
+                    "stop_reason": anytime_result.reason
+                }
+                anytime_trees_evaluated.record(anytime_result.trees_used, {"model_version": active_model.version})
+                anytime_exits_total.add(1, {"reason": anytime_result.reason, "model_version": active_model.version})
+                span.set_attribute("prediction.trees_used", anytime_result.trees_used)
+                span.set_attribute("prediction.exact", anytime_result.exact)
+            else:
+                # Một lần predict_proba thay cho predict + predict_proba (2 lần duyệt forest)
+                pred_proba = active_model.model.predict_proba(X)[0]
+                pred = active_model.model.classes_[pred_proba.argmax()]
+            model_inference_duration.record(time.perf_counter() - inference_start, {
+                "model_role": "primary",
+                "model_version": active_model.version
+            })
+            if shadow_scorer:
+                shadow_scorer.submit(X, int(pred), float(pred_proba[1]))
             confidence = float(max(pred_proba))
             processing_time = time.time() - prediction_start_time
             result = "Sống sót" if pred == 1 else "Không sống sót"
             prediction_counter.add(1, {
                 "model": "random_forest", 
+                "model_version": active_model.version,
                 "result": str(pred),
-                "passenger_class": str(passenger.Pclass)
+                "passenger_class": str(passenger.Pclass),
+                "transport": transport
             })
-            prediction_duration.record(processing_time)
-            model_confidence.record(confidence)
+            prediction_duration.record(processing_time, {"model_version": active_model.version, "transport": transport})
+            model_confidence.record(confidence, {"model_version": active_model.version})
             if confidence < 0.6:
                 low_confidence_counter.add(1)
                 warning_message = f"⚠️ Low confidence prediction: {confidence:.3f}"
@@ -579,30 +1075,22 @@ def predict(passenger: Passenger):
             logger.info(json.dumps(log_data))
             syslog_message = f"Prediction: {result}, Confidence: {confidence:.3f}, Time: {processing_time:.3f}s"
             log_to_syslog(syslog_message)
-            response = {
-                "prediction": result,
-                "confidence": round(confidence, 3),
-                "processing_time": round(processing_time, 3),
-                "probabilities": {
-                    "not_survived": round(float(pred_proba[0]), 3),
-                    "survived": round(float(pred_proba[1]), 3)
-                },
-                "passenger_info": {
-                    "class": passenger.Pclass,
-                    "sex": passenger.Sex,
-                    "age": passenger.Age
-                },
-                "service": SERVICE_NAME,
-                "timestamp": datetime.now().isoformat()
+            return {
+                "pred": int(pred),
+                "proba": pred_proba,
+                "confidence": confidence,
+                "processing_time": processing_time,
+                "result": result,
+                "model_version": active_model.version,
+                "inference": inference_info
             }
-            return response
         except ValueError as e:
             span.set_attribute("error", str(e))
             span.set_attribute("error.type", "ValidationError")
             error_message = f"❌ Validation error: {e}"
             logger.error(error_message)
             log_to_syslog(error_message, syslog.LOG_ERR)
-            raise HTTPException(status_code=422, detail=f"Validation error: {e}")
+            raise
         except Exception as e:
             processing_time = time.time() - prediction_start_time
             span.set_attribute("error", str(e))
@@ -611,7 +1099,178 @@ def predict(passenger: Passenger):
             error_message = f"❌ Prediction error: {e}"
             logger.error(error_message, exc_info=True)
             log_to_syslog(error_message, syslog.LOG_ERR)
-            raise HTTPException(status_code=500, detail=f"Prediction error: {e}")
+            raise
+
+@app.post("/predict")
+def predict(passenger: Passenger):
+    if not startup_state["ready"]:
+        raise HTTPException(status_code=503, detail="Model is not ready yet")
+    try:
+        outcome = score_passenger(passenger, "http")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Validation error: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {e}")
+    pred_proba = outcome["proba"]
+    response = {
+        "prediction": outcome["result"],
+        "confidence": round(outcome["confidence"], 3),
+        "processing_time": round(outcome["processing_time"], 3),
+        "probabilities": {
+            "not_survived": round(float(pred_proba[0]), 3),
+            "survived": round(float(pred_proba[1]), 3)
+        },
+        "passenger_info": {
+            "class": passenger.Pclass,
+            "sex": passenger.Sex,
+            "age": passenger.Age
+        },
+        "service": SERVICE_NAME,
+        "timestamp": datetime.now().isoformat()
+    }
+    if outcome["inference"]:
+        response["inference"] = outcome["inference"]
+    return response
+
+def grpc_predict(request):
+    """gRPC Predict/PredictStream handler: same validation and path as /predict"""
+    passenger = Passenger(
+        Pclass=request.pclass,
+        Sex=request.sex,
+        Age=request.age,
+        SibSp=request.sibsp,
+        Parch=request.parch,
+        Fare=request.fare,
+        Embarked=request.embarked,
+    )
+    outcome = score_passenger(passenger, "grpc")
+    return {
+        "prediction": outcome["pred"],
+        "survived_probability": float(outcome["proba"][1]),
+        "confidence": outcome["confidence"],
+        "model_version": outcome["model_version"],
+        "processing_time": outcome["processing_time"],
+        "trees_used": outcome["inference"]["trees_used"] if outcome["inference"] else 0,
+    }
+
+def on_grpc_call(method, code, duration):
+    grpc_requests_total.add(1, {"method": method, "status_code": code})
+    grpc_request_duration.record(duration, {"method": method, "status_code": code})
+    if code != "OK":
+        log_to_syslog(f"gRPC {code} on {method}", syslog.LOG_WARNING)
+
+def start_grpc_server():
+    """Start the optional gRPC inference service next to the HTTP app"""
+    global inference_server
+    from grpc_service import InferenceServer
+    inference_server = InferenceServer(
+        grpc_predict,
+        ready_fn=lambda: startup_state["ready"],
+        on_call=on_grpc_call,
+        port=GRPC_PORT,
+        workers=GRPC_WORKERS,
+        max_streams=GRPC_MAX_STREAMS,
+    )
+    port = inference_server.start()
+    grpc_message = f"⚡ gRPC inference service listening on port {port} ({GRPC_WORKERS} workers, max {GRPC_MAX_STREAMS} streams)"
+    logger.info(grpc_message)
+    log_to_syslog(grpc_message)
+
+def explain_passengers(passengers, span):
+    """Predict and explain a list of passengers in one vectorized pass"""
+    if not startup_state["ready"]:
+        raise HTTPException(status_code=503, detail="Model is not ready yet")
+    active_model = model_manager.current
+    explainer = active_model.extras.get("explain")
+    if explainer is None:
+        raise HTTPException(status_code=503, detail="Explanations are not available for the current model")
+    span.set_attribute("model.version", active_model.version)
+    span.set_attribute("explain.batch_size", len(passengers))
+    try:
+        X = pd.DataFrame([passenger_to_row(passenger) for passenger in passengers])
+    except ValueError as e:
+        span.set_attribute("error", str(e))
+        span.set_attribute("error.type", "ValidationError")
+        error_message = f"❌ Validation error: {e}"
+        logger.error(error_message)
+        log_to_syslog(error_message, syslog.LOG_ERR)
+        raise HTTPException(status_code=422, detail=f"Validation error: {e}")
+    try:
+        explain_start = time.perf_counter()
+        result = explainer.explain(X)
+        explain_time = time.perf_counter() - explain_start
+        explanation_duration.record(explain_time, {
+            "model_version": active_model.version,
+            "batch": str(len(passengers) > 1).lower()
+        })
+        span.set_attribute("explain.processing_time", explain_time)
+        explanations = []
+        for i, passenger in enumerate(passengers):
+            pred = result.predictions[i]
+            confidence = float(max(result.proba[i]))
+            explanations.append({
+                "prediction": "Sống sót" if pred == 1 else "Không sống sót",
+                "confidence": round(confidence, 3),
+                "probabilities": {
+                    "not_survived": round(float(result.proba[i][0]), 3),
+                    "survived": round(float(result.proba[i][1]), 3)
+                },
+                "explanation": {
+                    "base_value": round(float(result.base_value), 4),
+                    "contributions": {
+                        name: round(value, 4) for name, value in result.contributions_for(i).items()
+                    }
+                },
+                "passenger_info": {
+                    "class": passenger.Pclass,
+                    "sex": passenger.Sex,
+                    "age": passenger.Age
+                }
+            })
+        logger.info(json.dumps({
+            "event": "explanation_made",
+            "count": len(passengers),
+            "processing_time": round(explain_time, 4),
+            "model_version": active_model.version
+        }))
+        return explanations, explain_time, active_model.version
+    except Exception as e:
+        span.set_attribute("error", str(e))
+        span.set_attribute("error.type", type(e).__name__)
+        error_message = f"❌ Explanation error: {e}"
+        logger.error(error_message, exc_info=True)
+        log_to_syslog(error_message, syslog.LOG_ERR)
+        raise HTTPException(status_code=500, detail=f"Explanation error: {e}")
+
+@app.post("/predict/explain")
+def predict_explain(passenger: Passenger):
+    with tracer.start_as_current_span("prediction_explain") as span:
+        explanations, explain_time, version = explain_passengers([passenger], span)
+        response = explanations[0]
+        response.update({
+            "processing_time": round(explain_time, 4),
+            "model_version": version,
+            "service": SERVICE_NAME,
+            "timestamp": datetime.now().isoformat()
+        })
+        return response
+
+@app.post("/predict/explain/batch")
+def predict_explain_batch(passengers: List[Passenger]):
+    if not passengers:
+        raise HTTPException(status_code=422, detail="Validation error: at least one passenger is required")
+    if len(passengers) > EXPLAIN_MAX_BATCH:
+        raise HTTPException(status_code=422, detail=f"Validation error: batch size exceeds {EXPLAIN_MAX_BATCH}")
+    with tracer.start_as_current_span("prediction_explain_batch") as span:
+        explanations, explain_time, version = explain_passengers(passengers, span)
+        return {
+            "results": explanations,
+            "count": len(explanations),
+            "processing_time": round(explain_time, 4),
+            "model_version": version,
+            "service": SERVICE_NAME,
+            "timestamp": datetime.now().isoformat()
+        }
 
 @app.post("/simulate_error")
 def simulate_error():
@@ -702,6 +1361,23 @@ def get_system_metrics():
             log_to_syslog(error_message, syslog.LOG_ERR)
             raise HTTPException(status_code=500, detail=f"Error collecting metrics: {e}")
 
+@app.get("/metrics/drift")
+def get_drift_metrics():
+    if drift_monitor is None or not drift_monitor.enabled:
+        raise HTTPException(status_code=404, detail="Drift monitoring is not active")
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "service": SERVICE_NAME,
+        "profile": drift_monitor.profile_path,
+        "window_samples": round(drift_monitor.window_samples, 1),
+        "pending_samples": round(drift_monitor.samples, 1),
+        "recompute_interval_seconds": DRIFT_INTERVAL,
+        "features": {
+            feature: {name: round(value, 5) for name, value in scores.items()}
+            for feature, scores in drift_monitor.scores.items()
+        }
+    }
+
 @app.get("/info")
 def get_service_info():
     global request_count, error_count, service_start_time
@@ -712,9 +1388,24 @@ def get_service_info():
         "description": "Titanic Survival Prediction API with SigNoz monitoring",
         "otlp_endpoint": OTEL_ENDPOINT,
         "model_info": {
-            "path": MODEL_PATH,
+            "path": model_manager.current.path if model_manager.current else MODEL_PATH,
+            "version": model_manager.current.version if model_manager.current else None,
+            "loaded_at": model_manager.current.loaded_at if model_manager.current else None,
+            "hot_reload": "enabled" if MODEL_WATCH_ENABLED else "disabled",
+            "shadow": {
+                "version": shadow_scorer.manager.current.version,
+                "sample_rate": SHADOW_SAMPLE_RATE,
+                "compared": shadow_scorer.compared,
+                "disagreement_rate": round(shadow_scorer.disagreement_rate, 4),
+                "dropped": shadow_scorer.dropped
+            } if shadow_scorer and shadow_scorer.manager.current else None,
             "type": "Random Forest Classifier (ML - No GPU needed)",
-            "status": "loaded"
+            "status": "loaded" if startup_state["ready"] else "starting"
+        },
+        "startup": {
+            "mode": STARTUP_MODE,
+            "ready": startup_state["ready"],
+            "phases_seconds": startup_state["phases"]
         },
         "runtime_stats": {
             "uptime_seconds": round(uptime, 1),
@@ -723,8 +1414,8 @@ def get_service_info():
             "requests_per_second": round(request_count / uptime if uptime > 0 else 0, 2)
         },
         "monitoring": {
-            "tracing": "enabled",
-            "metrics": "enabled", 
+            "tracing": "enabled" if TELEMETRY_ENABLED else "disabled",
+            "metrics": "enabled" if TELEMETRY_ENABLED else "disabled",
             "logging": {
                 "file": "enabled",
                 "stdout": "enabled",
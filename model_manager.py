@@ -0,0 +1,256 @@
+"""Model loading, warm-up and zero-downtime hot-reload.
+
+`ModelManager.current` is a single `LoadedModel` reference. Request handlers
+read it once and keep using that object, so swapping the reference lets
+in-flight requests finish on the old model while new ones see the new one.
+New artifacts are loaded, warmed up and validated on the watcher thread
+before the swap; a candidate that fails validation is never served.
+"""
+import hashlib
+import itertools
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+FEATURE_COLUMNS = ['Pclass', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare', 'Embarked']
+LABEL_COLUMN = 'Survived'
+
+# Một passenger cho mỗi tổ hợp Pclass/Sex/Embarked
+WARMUP_ROWS = [
+    {'Pclass': pclass, 'Sex': sex, 'Age': 30.0, 'SibSp': 0, 'Parch': 0, 'Fare': 15.0, 'Embarked': embarked}
+    for pclass, sex, embarked in itertools.product([1, 2, 3], ['male', 'female'], ['C', 'Q', 'S'])
+]
+
+
+# Single-row predict_proba calls used for the p99 latency check, cycling over
+# at most LATENCY_SAMPLE_ROWS holdout rows
+LATENCY_SAMPLE_ROWS = 50
+LATENCY_SAMPLE_CALLS = 50
+
+
+class ModelValidationError(Exception):
+    """Raised when a candidate model fails the pre-swap checks"""
+
+
+class LoadedModel:
+    """An immutable model artifact plus the metadata served alongside it.
+
+    `extras` holds structures precomputed from the artifact by the manager's
+    preparers, so they are swapped atomically together with the model.
+    """
+
+    __slots__ = ("model", "version", "path", "loaded_at", "extras")
+
+    def __init__(self, model, version, path, extras=None):
+        self.model = model
+        self.version = version
+        self.path = path
+        self.loaded_at = datetime.now().isoformat()
+        self.extras = extras or {}
+
+
+def file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()[:12]
+
+
+def warm_up(model):
+    """Run synthetic predictions over every categorical combination"""
+    import pandas as pd
+
+    # Batch path trước, sau đó single-row path giống /predict
+    model.predict_proba(pd.DataFrame(WARMUP_ROWS))
+    for row in WARMUP_ROWS:
+        X = pd.DataFrame([row])
+        model.predict(X)
+        model.predict_proba(X)
+
+
+class ModelManager:
+    """Owns the active model and swaps in new versions from disk.
+
+    With `model_dir` set, every entry in it is a version: either
+    `<version>.pkl` or `<version>/<model file name>`; the entry that sorts
+    last is the one served. Otherwise `model_path` is watched for changes
+    and the version is a content hash.
+
+    `preparers` maps a name to a callable taking the fitted model; each
+    result is stored in `LoadedModel.extras[name]`. A preparer that fails
+    is logged and skipped rather than rejecting the artifact.
+    """
+
+    def __init__(self, model_path, model_dir=None, mmap_mode=None, warmup=True, holdout_path=None,
+                 max_latency_ms=50.0, min_accuracy=0.0, min_agreement=0.0, on_reload=None, preparers=None):
+        self.model_path = model_path
+        self.model_dir = model_dir
+        self.mmap_mode = mmap_mode
+        self.warmup = warmup
+        self.holdout_path = holdout_path
+        self.max_latency_ms = max_latency_ms
+        self.min_accuracy = min_accuracy
+        self.min_agreement = min_agreement
+        self.on_reload = on_reload
+        self.preparers = preparers or {}
+        self.current = None
+        self._fingerprint = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def resolve_path(self):
+        """Return (path, version name or None) of the artifact that should be served"""
+        if not self.model_dir:
+            return self.model_path, None
+        file_name = os.path.basename(self.model_path)
+        for entry in sorted(os.listdir(self.model_dir), reverse=True):
+            full = os.path.join(self.model_dir, entry)
+            if os.path.isdir(full) and os.path.exists(os.path.join(full, file_name)):
+                return os.path.join(full, file_name), entry
+            if entry.endswith(".pkl") and os.path.isfile(full):
+                return full, entry[:-len(".pkl")]
+        raise FileNotFoundError(f"No model versions found in '{self.model_dir}'")
+
+    def _fingerprint_of(self, path):
+        stat = os.stat(path)
+        return path, stat.st_mtime_ns, stat.st_size
+
+    def load_artifact(self, path, version=None):
+        # joblib kéo theo numpy nên chỉ import lúc load (lazy startup)
+        import joblib
+
+        model = joblib.load(path, mmap_mode=self.mmap_mode)
+        for attr in ("predict", "predict_proba"):
+            if not hasattr(model, attr):
+                raise ModelValidationError(f"Artifact '{path}' has no {attr}()")
+        extras = {}
+        for name, prepare in self.preparers.items():
+            try:
+                extras[name] = prepare(model)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not prepare '{name}' for {path}: {e}")
+        return LoadedModel(model, version or file_digest(path), path, extras)
+
+    def load_initial(self):
+        """Load the first model; no validation gates apply and the caller warms it up"""
+        path, version = self.resolve_path()
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Model file '{path}' not found")
+        loaded = self.load_artifact(path, version)
+        self._fingerprint = self._fingerprint_of(path)
+        self.current = loaded
+        return loaded
+
+    def _holdout(self):
+        """Return (features DataFrame, labels or None) used for validation"""
+        import pandas as pd
+
+        if self.holdout_path:
+            data = pd.read_csv(self.holdout_path)
+            labels = data[LABEL_COLUMN].to_numpy() if LABEL_COLUMN in data.columns else None
+            return data[FEATURE_COLUMNS], labels
+        return pd.DataFrame(WARMUP_ROWS), None
+
+    def validate(self, candidate):
+        """Check correctness and single-row latency of a candidate before swapping"""
+        import pandas as pd
+
+        X, labels = self._holdout()
+        proba = candidate.model.predict_proba(X)
+        if proba.shape != (len(X), 2):
+            raise ModelValidationError(f"predict_proba returned shape {proba.shape}, expected ({len(X)}, 2)")
+        if abs(proba.sum(axis=1) - 1.0).max() > 1e-6:
+            raise ModelValidationError("predict_proba rows do not sum to 1")
+        classes = getattr(candidate.model, "classes_", None)
+        predictions = classes[proba.argmax(axis=1)] if classes is not None else proba.argmax(axis=1)
+
+        report = {"samples": len(X)}
+        if labels is not None:
+            accuracy = float((predictions == labels).mean())
+            report["accuracy"] = round(accuracy, 4)
+            if accuracy < self.min_accuracy:
+                raise ModelValidationError(f"Accuracy {accuracy:.3f} below minimum {self.min_accuracy:.3f}")
+        if self.current is not None:
+            current_predictions = self.current.model.predict(X)
+            agreement = float((predictions == current_predictions).mean())
+            report["agreement_with_current"] = round(agreement, 4)
+            # Không có label thì agreement với model đang chạy là gate correctness duy nhất
+            if labels is None and agreement < self.min_agreement:
+                raise ModelValidationError(
+                    f"Agreement with current model {agreement:.3f} below minimum {self.min_agreement:.3f}"
+                )
+
+        # Latency đo trên mẫu cố định: holdout lớn không làm reload tốn CPU tỉ lệ theo số dòng
+        rows = X.iloc[:LATENCY_SAMPLE_ROWS].to_dict("records")
+        latencies = []
+        for i in range(LATENCY_SAMPLE_CALLS):
+            single = pd.DataFrame([rows[i % len(rows)]])
+            start = time.perf_counter()
+            candidate.model.predict_proba(single)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        p99_ms = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000
+        report["p99_latency_ms"] = round(p99_ms, 3)
+        if p99_ms > self.max_latency_ms:
+            raise ModelValidationError(f"p99 latency {p99_ms:.1f}ms above budget {self.max_latency_ms:.1f}ms")
+        return report
+
+    def check_for_update(self):
+        """Load, warm up, validate and swap in a changed artifact. Returns True on swap."""
+        try:
+            path, version = self.resolve_path()
+            fingerprint = self._fingerprint_of(path)
+        except OSError as e:
+            logger.warning(f"⚠️ Model watch could not stat model: {e}")
+            return False
+        if fingerprint == self._fingerprint:
+            return False
+        # Ghi nhận fingerprint ngay để artifact lỗi không bị load lại liên tục
+        self._fingerprint = fingerprint
+
+        started = time.perf_counter()
+        try:
+            candidate = self.load_artifact(path, version)
+            if self.warmup:
+                warm_up(candidate.model)
+            report = self.validate(candidate)
+        except Exception as e:
+            logger.error(f"❌ Model candidate {path} rejected: {e}")
+            if self.on_reload:
+                self.on_reload("rejected", version or path, {"error": str(e)})
+            return False
+
+        previous = self.current
+        self.current = candidate
+        report["reload_seconds"] = round(time.perf_counter() - started, 3)
+        logger.info(
+            f"🔄 Model swapped {previous.version if previous else None} -> {candidate.version} ({report})"
+        )
+        if self.on_reload:
+            self.on_reload("swapped", candidate.version, report)
+        return True
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            self.check_for_update()
+
+    def start_watching(self, interval=10.0):
+        if self._thread is not None:
+            return
+        if not self.holdout_path and self.min_agreement <= 0:
+            logger.warning("⚠️ Model watch has no correctness gate: set a holdout path or a minimum agreement")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, args=(interval,), name="model-watch", daemon=True)
+        self._thread.start()
+
+    def stop_watching(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=5.0)
+        self._thread = None
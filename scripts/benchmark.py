@@ -0,0 +1,325 @@
+"""Offline latency/throughput benchmark for the Titanic API hot path.
+
+Mỗi variant chạy trong một subprocess riêng (main.py cấu hình telemetry/logging
+lúc import), app được gọi in-process qua httpx.ASGITransport và OTLP exporter
+gửi tới một gRPC sink local nên không cần SigNoz hay network.
+
+Usage:
+    python scripts/benchmark.py
+    python scripts/benchmark.py --variants full,bare --concurrency 1,16 --requests 500
+    python scripts/benchmark.py --update-baseline
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent import futures
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+DEFAULT_OUTPUT = os.path.join(REPO_ROOT, "bench_output.json")
+
+# Variant -> environment overrides applied before importing main.py
+VARIANTS = {
+    "full": {},
+    "no-telemetry": {"TELEMETRY_ENABLED": "false"},
+    "no-logging": {"LOG_LEVEL": "CRITICAL"},
+    "no-syslog": {"SYSLOG_ENABLED": "false"},
+    "bare": {"TELEMETRY_ENABLED": "false", "LOG_LEVEL": "CRITICAL", "SYSLOG_ENABLED": "false"},
+}
+
+SAMPLE_PASSENGER = {
+    "Pclass": 3, "Sex": "male", "Age": 22, "SibSp": 1, "Parch": 0, "Fare": 7.25, "Embarked": "S"
+}
+
+# Endpoint -> (method, json body, request count key)
+ENDPOINTS = {
+    "/predict": ("POST", SAMPLE_PASSENGER, "requests"),
+    "/health": ("GET", None, "slow_requests"),
+    "/metrics/system": ("GET", None, "slow_requests"),
+}
+
+# Metrics compared against the baseline and the direction that counts as a regression
+REGRESSION_CHECKS = {
+    "p50_ms": "higher",
+    "p99_ms": "higher",
+    "throughput_rps": "lower",
+}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile over an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(latencies, errors, elapsed):
+    """Build the machine-readable summary for one endpoint/concurrency run"""
+    latencies.sort()
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 4),
+        "throughput_rps": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        "mean_ms": round(sum(latencies) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "p999_ms": round(percentile(latencies, 99.9) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if count else 0.0,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Local OTLP sink
+# ---------------------------------------------------------------------------
+
+def start_otlp_sink():
+    """Start an in-process OTLP/gRPC collector that accepts and drops exports"""
+    import grpc
+    from opentelemetry.proto.collector.trace.v1 import trace_service_pb2, trace_service_pb2_grpc
+    from opentelemetry.proto.collector.metrics.v1 import metrics_service_pb2, metrics_service_pb2_grpc
+
+    stats = {"trace_exports": 0, "metric_exports": 0}
+
+    class TraceSink(trace_service_pb2_grpc.TraceServiceServicer):
+        def Export(self, request, context):
+            stats["trace_exports"] += 1
+            return trace_service_pb2.ExportTraceServiceResponse()
+
+    class MetricSink(metrics_service_pb2_grpc.MetricsServiceServicer):
+        def Export(self, request, context):
+            stats["metric_exports"] += 1
+            return metrics_service_pb2.ExportMetricsServiceResponse()
+
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    trace_service_pb2_grpc.add_TraceServiceServicer_to_server(TraceSink(), server)
+    metrics_service_pb2_grpc.add_MetricsServiceServicer_to_server(MetricSink(), server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    return server, port, stats
+
+
+# ---------------------------------------------------------------------------
+# Worker (runs inside the variant subprocess)
+# ---------------------------------------------------------------------------
+
+async def run_endpoint(client, path, method, body, total, concurrency):
+    """Send `total` requests to `path` with at most `concurrency` in flight"""
+    latencies = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def run_worker(args):
+    """Import the app with the current env and benchmark every endpoint"""
+    import httpx
+
+    os.chdir(REPO_ROOT)
+    sys.path.insert(0, REPO_ROOT)
+    import_start = time.perf_counter()
+    import main
+    import_seconds = time.perf_counter() - import_start
+
+    counts = {"requests": args.requests, "slow_requests": args.slow_requests}
+    concurrencies = [int(c) for c in args.concurrency.split(",")]
+    results = {"import_seconds": round(import_seconds, 4), "endpoints": {}}
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for path, (method, body, count_key) in ENDPOINTS.items():
+            # Warm-up so first-call costs (sklearn, pydantic) are not measured
+            for _ in range(args.warmup):
+                await client.request(method, path, json=body)
+            results["endpoints"][path] = {}
+            for concurrency in concurrencies:
+                total = counts[count_key]
+                summary = await run_endpoint(client, path, method, body, total, concurrency)
+                results["endpoints"][path][str(concurrency)] = summary
+
+    with open(args.result_file, "w") as f:
+        json.dump(results, f)
+
+
+# ---------------------------------------------------------------------------
+# Orchestrator
+# ---------------------------------------------------------------------------
+
+def run_variant(name, args, sink_port, log_dir):
+    """Run one variant in a fresh interpreter and return its results"""
+    env = dict(os.environ)
+    env.update({
+        "OTEL_EXPORTER_OTLP_ENDPOINT": f"http://127.0.0.1:{sink_port}",
+        "LOG_DIR": os.path.join(log_dir, name),
+    })
+    env.update(VARIANTS[name])
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+        result_file = tmp.name
+    cmd = [
+        sys.executable, os.path.abspath(__file__), "--worker",
+        "--result-file", result_file,
+        "--requests", str(args.requests),
+        "--slow-requests", str(args.slow_requests),
+        "--concurrency", args.concurrency,
+        "--warmup", str(args.warmup),
+    ]
+    try:
+        completed = subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if completed.returncode != 0:
+            # stderr của worker chứa traceback lúc import main.py hoặc lúc chạy
+            print(completed.stderr.decode("utf-8", errors="replace"), file=sys.stderr)
+            raise RuntimeError(f"Variant '{name}' failed with exit code {completed.returncode}")
+        with open(result_file) as f:
+            return json.load(f)
+    finally:
+        os.unlink(result_file)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def compare_with_baseline(report, baseline, tolerance):
+    """Return a list of human-readable regressions against the baseline"""
+    regressions = []
+    for variant, variant_data in baseline.get("variants", {}).items():
+        current_variant = report["variants"].get(variant)
+        if current_variant is None:
+            continue
+        for path, by_concurrency in variant_data["endpoints"].items():
+            for concurrency, expected in by_concurrency.items():
+                current = current_variant["endpoints"].get(path, {}).get(concurrency)
+                if current is None:
+                    continue
+                for metric, direction in REGRESSION_CHECKS.items():
+                    old, new = expected[metric], current[metric]
+                    if old <= 0:
+                        continue
+                    if direction == "higher" and new > old * (1 + tolerance):
+                        regressions.append(f"{variant} {path} c={concurrency} {metric}: {old} -> {new}")
+                    elif direction == "lower" and new < old * (1 - tolerance):
+                        regressions.append(f"{variant} {path} c={concurrency} {metric}: {old} -> {new}")
+    return regressions
+
+
+def print_report(report):
+    print(f"{'variant':<14}{'endpoint':<17}{'conc':>5}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}{'p999 ms':>10}{'errors':>8}")
+    for variant, data in report["variants"].items():
+        for path, by_concurrency in data["endpoints"].items():
+            for concurrency, s in by_concurrency.items():
+                print(f"{variant:<14}{path:<17}{concurrency:>5}{s['throughput_rps']:>10.1f}"
+                      f"{s['p50_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['p999_ms']:>10.2f}{s['errors']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Titanic API hot path in-process")
+    parser.add_argument("--variants", default=",".join(VARIANTS), help="Comma-separated variants to run")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per /predict run")
+    parser.add_argument("--slow-requests", type=int, default=20,
+                        help="Requests per /health and /metrics/system run (they sample psutil CPU)")
+    parser.add_argument("--warmup", type=int, default=20, help="Warm-up requests per endpoint")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write the JSON results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression")
+    parser.add_argument("--update-baseline", action="store_true", help="Overwrite the baseline with this run")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        asyncio.run(run_worker(args))
+        return 0
+
+    variants = [v.strip() for v in args.variants.split(",") if v.strip()]
+    unknown = [v for v in variants if v not in VARIANTS]
+    if unknown:
+        parser.error(f"unknown variants: {', '.join(unknown)} (choose from {', '.join(VARIANTS)})")
+
+    print("🚀 Starting benchmark...")
+    server, sink_port, sink_stats = start_otlp_sink()
+    print(f"📡 Local OTLP sink on 127.0.0.1:{sink_port}")
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "slow_requests": args.slow_requests,
+            "warmup": args.warmup,
+        },
+        "variants": {},
+    }
+    try:
+        with tempfile.TemporaryDirectory() as log_dir:
+            for variant in variants:
+                print(f"⏱️  Running variant '{variant}'...")
+                report["variants"][variant] = run_variant(variant, args, sink_port, log_dir)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        server.stop(grace=None)
+    report["otlp_sink"] = sink_stats
+
+    print_report(report)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results written to {args.output}")
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📌 Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        # Baseline phụ thuộc máy nên không commit sẵn; tạo bằng --update-baseline
+        print(f"⚠️  No baseline at {args.baseline}, skipping regression check "
+              f"(create one on this machine with --update-baseline)")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare_with_baseline(report, baseline, args.tolerance)
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for line in regressions:
+            print(f"   - {line}")
+        return 1
+    print("✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""Build the drift reference profile stored next to a model artifact.
+
+Reads the training data (CSV with the Passenger columns) and writes
+`<model>.profile.json` with quantile bin edges for Age/Fare and category
+frequencies for the categorical features, in the format drift.py expects.
+
+Usage:
+    python scripts/build_drift_profile.py --data train.csv
+    python scripts/build_drift_profile.py --data train.csv --model-path models/v2/best_rf_model.pkl --bins 20
+"""
+import argparse
+import json
+import os
+import sys
+from bisect import bisect_right
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from drift import profile_path_for
+
+NUMERIC_FEATURES = ['Age', 'Fare']
+CATEGORICAL_FEATURES = ['Pclass', 'Sex', 'Embarked', 'SibSp', 'Parch']
+
+
+def numeric_profile(values, bins):
+    values = sorted(float(v) for v in values)
+    edges = []
+    for i in range(1, bins):
+        edge = values[int(i * len(values) / bins)]
+        if not edges or edge > edges[-1]:
+            edges.append(edge)
+    counts = [0] * (len(edges) + 1)
+    for value in values:
+        counts[bisect_right(edges, value)] += 1
+    return {"edges": edges, "proportions": [count / len(values) for count in counts]}
+
+
+def categorical_profile(values, max_categories):
+    counts = values.value_counts()
+    top = counts.iloc[:max_categories]
+    categories = [value.item() if hasattr(value, "item") else value for value in top.index]
+    proportions = [float(count) / len(values) for count in top]
+    # Bucket cuối là "other" cho category hiếm hoặc chưa thấy lúc train
+    proportions.append(float(counts.iloc[max_categories:].sum()) / len(values))
+    return {"categories": categories, "proportions": proportions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the drift reference profile for a model")
+    parser.add_argument("--data", required=True, help="Training data CSV")
+    parser.add_argument("--model-path", default="best_rf_model.pkl", help="Model the profile belongs to")
+    parser.add_argument("--output", help="Output path (default: next to the model)")
+    parser.add_argument("--bins", type=int, default=10, help="Quantile bins for numeric features")
+    parser.add_argument("--max-categories", type=int, default=10, help="Categories kept per feature")
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    data = pd.read_csv(args.data)
+    if 'Sex' in data.columns:
+        data['Sex'] = data['Sex'].str.lower()
+    if 'Embarked' in data.columns:
+        data['Embarked'] = data['Embarked'].str.upper()
+
+    profile = {"numeric": {}, "categorical": {}, "source": os.path.basename(args.data), "rows": len(data)}
+    for feature in NUMERIC_FEATURES:
+        profile["numeric"][feature] = numeric_profile(data[feature].dropna(), args.bins)
+    for feature in CATEGORICAL_FEATURES:
+        profile["categorical"][feature] = categorical_profile(data[feature].dropna(), args.max_categories)
+
+    output = args.output or profile_path_for(args.model_path)
+    with open(output, "w") as f:
+        json.dump(profile, f, indent=2)
+    print(f"✅ Drift profile for {len(data)} rows written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+"""Compare /predict over HTTP+JSON with the gRPC inference service.
+
+Starts the API with uvicorn in a subprocess (GRPC_ENABLED=true, OTLP exporter
+pointed at the local sink from benchmark.py), then drives the same passenger
+through three transports over real loopback sockets:
+
+    http         POST /predict with a keep-alive session per client thread
+    grpc-unary   Predict on a shared HTTP/2 channel
+    grpc-stream  one PredictStream per client thread, one message in flight
+
+Every open PredictStream holds one server worker thread and the server rejects
+streams beyond GRPC_MAX_STREAMS and RPCs beyond GRPC_WORKERS in flight, so the
+API is started with GRPC_MAX_STREAMS equal to the highest concurrency level and
+twice that many workers; the server frees a slot slightly after the reply is
+sent, and without headroom back-to-back calls would see RESOURCE_EXHAUSTED
+(override with --grpc-workers; fewer than the concurrency is rejected up front).
+
+Usage:
+    python scripts/grpc_benchmark.py
+    python scripts/grpc_benchmark.py --concurrency 1,8 --requests 1000 --transports http,grpc-stream
+    python scripts/grpc_benchmark.py --no-telemetry --output grpc_bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import queue
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import REPO_ROOT, SAMPLE_PASSENGER, git_revision, start_otlp_sink, summarize
+from grpc_service import InferenceClient, PredictRequest
+
+TRANSPORTS = ["http", "grpc-unary", "grpc-stream"]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def grpc_request(request_id=0):
+    return PredictRequest(
+        pclass=SAMPLE_PASSENGER["Pclass"],
+        sex=SAMPLE_PASSENGER["Sex"],
+        age=SAMPLE_PASSENGER["Age"],
+        sibsp=SAMPLE_PASSENGER["SibSp"],
+        parch=SAMPLE_PASSENGER["Parch"],
+        fare=SAMPLE_PASSENGER["Fare"],
+        embarked=SAMPLE_PASSENGER["Embarked"],
+        request_id=request_id,
+    )
+
+
+def start_server(http_port, grpc_port, grpc_workers, max_streams, env_overrides, log_dir):
+    env = dict(os.environ)
+    env.update({
+        "GRPC_ENABLED": "true",
+        "GRPC_PORT": str(grpc_port),
+        "GRPC_WORKERS": str(grpc_workers),
+        "GRPC_MAX_STREAMS": str(max_streams),
+        "LOG_DIR": log_dir,
+    })
+    env.update(env_overrides)
+    cmd = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(http_port), "--log-level", "warning",
+    ]
+    return subprocess.Popen(cmd, cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_ready(base_url, process, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API exited with code {process.returncode} before becoming ready")
+        try:
+            if requests.get(f"{base_url}/health/ready", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"API not ready after {timeout}s")
+
+
+# ---------------------------------------------------------------------------
+# Per-transport clients: each client thread gets its own (call, close) pair;
+# call() sends one request and returns True on success.
+# ---------------------------------------------------------------------------
+
+def http_caller(base_url, timeout):
+    session = requests.Session()
+    url = f"{base_url}/predict"
+
+    def call():
+        return session.post(url, json=SAMPLE_PASSENGER, timeout=timeout).status_code == 200
+    return call, session.close
+
+
+def grpc_unary_caller(client, timeout):
+    request = grpc_request()
+
+    def call():
+        return client.predict(request, timeout=timeout).confidence > 0
+    return call, None
+
+
+def grpc_stream_caller(client, timeout):
+    outgoing = queue.Queue()
+    incoming = queue.Queue()
+    request = grpc_request()
+
+    def requests_iter():
+        while True:
+            item = outgoing.get()
+            if item is None:
+                return
+            yield item
+
+    replies = client.predict_stream(requests_iter())
+
+    # Iterator của gRPC stream không có timeout cho từng message nên
+    # reply được chuyển qua queue để call() có thể chờ với timeout
+    def drain():
+        try:
+            for reply in replies:
+                incoming.put(reply)
+        except Exception as e:
+            incoming.put(e)
+        incoming.put(None)
+
+    threading.Thread(target=drain, daemon=True).start()
+
+    def call():
+        outgoing.put(request)
+        try:
+            reply = incoming.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No PredictStream reply within {timeout}s")
+        if reply is None or isinstance(reply, Exception):
+            raise RuntimeError(f"PredictStream closed: {reply}")
+        return reply.code == 0
+
+    def close():
+        outgoing.put(None)
+        replies.cancel()
+    return call, close
+
+
+def run_transport(make_caller, total, concurrency, warmup, timeout):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    remaining = [total]
+    # Barrier có timeout: client không được phục vụ (vd. hết worker) không làm treo cả run
+    barrier = threading.Barrier(concurrency + 1, timeout=timeout + warmup * timeout)
+
+    def worker():
+        nonlocal errors
+        call, close = make_caller()
+        try:
+            for _ in range(warmup):
+                call()
+            barrier.wait()
+        except Exception:
+            barrier.abort()
+            if close:
+                close()
+            return
+        local, local_errors = [], 0
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+            start = time.perf_counter()
+            try:
+                ok = call()
+            except Exception:
+                ok = False
+            local.append(time.perf_counter() - start)
+            if not ok:
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            errors += local_errors
+        if close:
+            close()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    try:
+        barrier.wait()
+    except threading.BrokenBarrierError:
+        raise RuntimeError(f"Warm-up of {concurrency} clients failed or timed out")
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def payload_sizes(base_url, client):
+    """Request/response body bytes for one prediction on each encoding"""
+    response = requests.post(f"{base_url}/predict", json=SAMPLE_PASSENGER)
+    request = grpc_request(1)
+    return {
+        "http_json": {
+            "request_bytes": len(json.dumps(SAMPLE_PASSENGER).encode()),
+            "response_bytes": len(response.content),
+        },
+        "grpc_protobuf": {
+            "request_bytes": request.ByteSize(),
+            "response_bytes": client.predict(request).ByteSize(),
+        },
+    }
+
+
+def print_report(report):
+    print(f"{'transport':<14}{'conc':>5}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}{'p999 ms':>10}{'errors':>8}")
+    for transport, by_concurrency in report["transports"].items():
+        for concurrency, s in by_concurrency.items():
+            print(f"{transport:<14}{concurrency:>5}{s['throughput_rps']:>10.1f}"
+                  f"{s['p50_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['p999_ms']:>10.2f}{s['errors']:>8}")
+    for encoding, sizes in report["payload_bytes"].items():
+        print(f"   {encoding:<14} request {sizes['request_bytes']}B, response {sizes['response_bytes']}B")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /predict over HTTP+JSON against gRPC")
+    parser.add_argument("--transports", default=",".join(TRANSPORTS), help="Comma-separated transports to run")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated client thread counts")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per transport/concurrency run")
+    parser.add_argument("--warmup", type=int, default=20, help="Warm-up requests per client thread")
+    parser.add_argument("--grpc-workers", type=int,
+                        help="GRPC_WORKERS for the API (default: twice the highest concurrency level)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout in seconds")
+    parser.add_argument("--no-telemetry", action="store_true", help="Run the API with TELEMETRY_ENABLED=false")
+    parser.add_argument("--ready-timeout", type=float, default=60.0, help="Seconds to wait for /health/ready")
+    parser.add_argument("--output", default=os.path.join(REPO_ROOT, "grpc_bench_output.json"),
+                        help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    transports = [t.strip() for t in args.transports.split(",") if t.strip()]
+    unknown = [t for t in transports if t not in TRANSPORTS]
+    if unknown:
+        parser.error(f"unknown transports: {', '.join(unknown)} (choose from {', '.join(TRANSPORTS)})")
+    concurrencies = [int(c) for c in args.concurrency.split(",")]
+    grpc_workers = args.grpc_workers or 2 * max(concurrencies)
+    if any(t.startswith("grpc") for t in transports) and grpc_workers < max(concurrencies):
+        parser.error(f"--grpc-workers {grpc_workers} is below the highest concurrency {max(concurrencies)}: "
+                     f"calls beyond GRPC_WORKERS in flight are rejected with RESOURCE_EXHAUSTED")
+
+    print("🚀 Starting HTTP vs gRPC benchmark...")
+    sink, sink_port, sink_stats = start_otlp_sink()
+    env_overrides = {
+        "OTEL_EXPORTER_OTLP_ENDPOINT": f"http://127.0.0.1:{sink_port}",
+        "SYSLOG_ENABLED": "false",
+        "LOG_LEVEL": "WARNING",
+    }
+    if args.no_telemetry:
+        env_overrides["TELEMETRY_ENABLED"] = "false"
+    http_port, grpc_port = free_port(), free_port()
+    base_url = f"http://127.0.0.1:{http_port}"
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "grpc_workers": grpc_workers,
+            "telemetry": not args.no_telemetry,
+        },
+        "transports": {},
+    }
+    with tempfile.TemporaryDirectory() as log_dir:
+        server = start_server(http_port, grpc_port, grpc_workers, max(concurrencies), env_overrides, log_dir)
+        client = None
+        try:
+            wait_ready(base_url, server, args.ready_timeout)
+            print(f"📡 API ready - HTTP :{http_port}, gRPC :{grpc_port}")
+            client = InferenceClient(f"127.0.0.1:{grpc_port}")
+            client.wait_ready()
+            callers = {
+                "http": lambda: http_caller(base_url, args.timeout),
+                "grpc-unary": lambda: grpc_unary_caller(client, args.timeout),
+                "grpc-stream": lambda: grpc_stream_caller(client, args.timeout),
+            }
+            for transport in transports:
+                report["transports"][transport] = {}
+                for concurrency in concurrencies:
+                    print(f"⏱️  {transport} c={concurrency}...")
+                    report["transports"][transport][str(concurrency)] = run_transport(
+                        callers[transport], args.requests, concurrency, args.warmup, args.timeout
+                    )
+            report["payload_bytes"] = payload_sizes(base_url, client)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            return 1
+        finally:
+            if client:
+                client.close()
+            server.terminate()
+            server.wait(timeout=10)
+            sink.stop(grace=None)
+    report["otlp_sink"] = sink_stats
+
+    print_report(report)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+"""Open-loop asyncio load generator for the Titanic API.
+
+Requests are launched on a fixed arrival schedule regardless of how fast the
+server answers, and latency is measured from the *scheduled* send time, so a
+slow server shows up in the percentiles instead of silently lowering the
+request rate (coordinated omission).
+
+Usage:
+    python scripts/load_generator.py --rate 50 --duration 60
+    python scripts/load_generator.py --profile ramp --start-rate 5 --rate 200
+    python scripts/load_generator.py --profile poisson --rate 20 --burst-factor 5
+    python scripts/load_generator.py --mix predict=0.5,error=0.5 --json summary.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import datetime
+
+API_BASE_URL = "http://localhost:8000"
+
+# 80% normal requests, 10% errors, 5% slow requests, 5% health checks
+DEFAULT_MIX = {"predict": 0.80, "error": 0.10, "slow": 0.05, "health": 0.05}
+
+EDGE_CASE_PASSENGERS = [
+    {"Pclass": 3, "Sex": "male", "Age": 50, "SibSp": 0, "Parch": 0, "Fare": 5.0, "Embarked": "S"},
+    {"Pclass": 1, "Sex": "female", "Age": 2, "SibSp": 1, "Parch": 2, "Fare": 151.55, "Embarked": "S"},
+    {"Pclass": 2, "Sex": "male", "Age": 45, "SibSp": 1, "Parch": 1, "Fare": 25.0, "Embarked": "Q"},
+]
+
+
+def generate_passenger_data():
+    """Generate random passenger data"""
+    return {
+        "Pclass": random.choice([1, 2, 3]),
+        "Sex": random.choice(["male", "female"]),
+        "Age": random.randint(1, 80),
+        "SibSp": random.randint(0, 3),
+        "Parch": random.randint(0, 2),
+        "Fare": round(random.uniform(5, 500), 2),
+        "Embarked": random.choice(["C", "Q", "S"])
+    }
+
+
+def generate_edge_case_data():
+    """Pick a passenger that tends to produce low-confidence predictions"""
+    return random.choice(EDGE_CASE_PASSENGERS)
+
+
+# Request kind -> (endpoint, method, body factory, timeout seconds)
+REQUEST_KINDS = {
+    "predict": ("/predict", "POST", generate_passenger_data, 10),
+    "edge_case": ("/predict", "POST", generate_edge_case_data, 10),
+    "error": ("/simulate_error", "POST", None, 5),
+    "slow": ("/simulate_slow", "GET", None, 10),
+    "health": ("/health", "GET", None, 5),
+}
+
+
+class LatencyHistogram:
+    """HDR-style log-linear histogram of integer microsecond values.
+
+    Values below 2**SUB_BUCKET_BITS are stored exactly; above that each power
+    of two is split into 2**(SUB_BUCKET_BITS - 1) buckets, giving a constant
+    relative precision of under 1% across the whole range.
+    """
+
+    SUB_BUCKET_BITS = 8
+    SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+    HALF_BUCKET_BITS = SUB_BUCKET_BITS - 1
+
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = 0
+
+    def _index(self, value):
+        if value < self.SUB_BUCKET_COUNT:
+            return value
+        shift = value.bit_length() - self.SUB_BUCKET_BITS
+        return (shift << self.HALF_BUCKET_BITS) + (value >> shift)
+
+    def _highest_equivalent(self, index):
+        if index < self.SUB_BUCKET_COUNT:
+            return index
+        shift = (index >> self.HALF_BUCKET_BITS) - 1
+        mantissa = index - (shift << self.HALF_BUCKET_BITS)
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, seconds):
+        value = max(int(seconds * 1_000_000), 0)
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self.min = value if self.min is None else min(self.min, value)
+
+    def value_at_percentile(self, pct):
+        """Return the latency (ms) at the given percentile"""
+        if self.total == 0:
+            return 0.0
+        target = max(int(pct / 100.0 * self.total + 0.5), 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.max) / 1000.0
+        return self.max / 1000.0
+
+    def summary(self):
+        return {
+            "count": self.total,
+            "min_ms": round((self.min or 0) / 1000.0, 3),
+            "mean_ms": round(self.sum / self.total / 1000.0, 3) if self.total else 0.0,
+            "p50_ms": round(self.value_at_percentile(50), 3),
+            "p90_ms": round(self.value_at_percentile(90), 3),
+            "p99_ms": round(self.value_at_percentile(99), 3),
+            "p999_ms": round(self.value_at_percentile(99.9), 3),
+            "max_ms": round(self.max / 1000.0, 3),
+        }
+
+
+class EndpointStats:
+    """Per-request-kind counters and histograms"""
+
+    def __init__(self):
+        # response_time: from scheduled send (corrected), service_time: from actual send.
+        # Cả hai gồm cả request failed/timeout (latency tính tới lúc lỗi)
+        self.response_time = LatencyHistogram()
+        self.service_time = LatencyHistogram()
+        self.status_codes = {}
+        self.failures = 0
+
+    def summary(self):
+        return {
+            "requests": self.response_time.total,
+            "failures": self.failures,
+            "status_codes": dict(sorted(self.status_codes.items())),
+            "response_time": self.response_time.summary(),
+            "service_time": self.service_time.summary(),
+        }
+
+
+def arrival_offsets(profile, rate, duration, start_rate=None, burst_factor=1.0,
+                    burst_interval=10.0, burst_duration=2.0):
+    """Yield scheduled send offsets (seconds from start) for the given profile"""
+    t = 0.0
+    while t < duration:
+        yield t
+        if profile == "ramp":
+            begin = rate if start_rate is None else start_rate
+            current = begin + (rate - begin) * (t / duration)
+        elif profile == "poisson" and (t % burst_interval) < burst_duration:
+            current = rate * burst_factor
+        else:
+            current = rate
+        current = max(current, 1e-6)
+        if profile == "poisson":
+            t += random.expovariate(current)
+        else:
+            t += 1.0 / current
+
+
+def parse_mix(text):
+    """Parse 'predict=0.8,error=0.2' into a normalised weight dict"""
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in REQUEST_KINDS:
+            raise ValueError(f"unknown request kind '{kind}' (choose from {', '.join(REQUEST_KINDS)})")
+        mix[kind] = float(weight)
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("mix weights must sum to a positive value")
+    return {kind: weight / total for kind, weight in mix.items()}
+
+
+async def send_request(client, kind, scheduled, stats):
+    """Fire one request; latency is measured from its scheduled time"""
+    path, method, body_factory, timeout = REQUEST_KINDS[kind]
+    body = body_factory() if body_factory else None
+    sent = time.perf_counter()
+    try:
+        response = await client.request(method, path, json=body, timeout=timeout)
+        done = time.perf_counter()
+        entry = stats[kind]
+        entry.response_time.record(done - scheduled)
+        entry.service_time.record(done - sent)
+        code = str(response.status_code)
+        entry.status_codes[code] = entry.status_codes.get(code, 0) + 1
+    except Exception:
+        # Timeout/lỗi vẫn vào histogram: dưới overload đây là các request chậm nhất,
+        # bỏ qua chúng sẽ làm percentile đẹp hơn thực tế
+        done = time.perf_counter()
+        entry = stats[kind]
+        entry.response_time.record(done - scheduled)
+        entry.service_time.record(done - sent)
+        entry.failures += 1
+
+
+async def run_load(base_url, mix, profile, rate, duration, start_rate=None, burst_factor=1.0,
+                   burst_interval=10.0, burst_duration=2.0, max_connections=100, report_interval=15.0):
+    """Drive the open-loop schedule and return the collected stats"""
+    import httpx
+
+    kinds = list(mix)
+    weights = [mix[k] for k in kinds]
+    stats = {kind: EndpointStats() for kind in kinds}
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    pending = set()
+    sent = 0
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+        start = time.perf_counter()
+        next_report = report_interval
+        for offset in arrival_offsets(profile, rate, duration, start_rate,
+                                      burst_factor, burst_interval, burst_duration):
+            scheduled = start + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            kind = random.choices(kinds, weights)[0]
+            task = asyncio.create_task(send_request(client, kind, scheduled, stats))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            sent += 1
+            if offset >= next_report:
+                next_report += report_interval
+                elapsed = time.perf_counter() - start
+                print(f"📊 Progress: {sent} requests scheduled in {elapsed:.1f}s, {len(pending)} in flight")
+        if pending:
+            await asyncio.gather(*pending)
+        elapsed = time.perf_counter() - start
+
+    return stats, sent, elapsed
+
+
+def build_summary(stats, sent, elapsed, config):
+    endpoints = {}
+    for kind, entry in stats.items():
+        if entry.response_time.total or entry.failures:
+            endpoints[kind] = entry.summary()
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "config": config,
+        "requests_sent": sent,
+        "elapsed_seconds": round(elapsed, 3),
+        "achieved_rps": round(sent / elapsed, 2) if elapsed > 0 else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+def print_report(summary):
+    print(f"\n{'kind':<11}{'count':>8}{'fail':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'p99.9 ms':>10}{'max ms':>10}  status")
+    for kind, data in summary["endpoints"].items():
+        rt = data["response_time"]
+        codes = " ".join(f"{code}:{n}" for code, n in data["status_codes"].items())
+        print(f"{kind:<11}{data['requests']:>8}{data['failures']:>6}{rt['p50_ms']:>10.2f}{rt['p90_ms']:>10.2f}"
+              f"{rt['p99_ms']:>10.2f}{rt['p999_ms']:>10.2f}{rt['max_ms']:>10.2f}  {codes}")
+    print(f"\nSent {summary['requests_sent']} requests in {summary['elapsed_seconds']}s "
+          f"({summary['achieved_rps']} req/s achieved)")
+
+
+def build_parser(description, rate=3.0, duration=300.0, mix=None):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--url", default=API_BASE_URL, help="Target API base URL")
+    parser.add_argument("--rate", type=float, default=rate, help="Target arrival rate (req/s)")
+    parser.add_argument("--duration", type=float, default=duration, help="Run duration in seconds")
+    parser.add_argument("--profile", choices=["constant", "ramp", "poisson"], default="constant",
+                        help="Arrival schedule")
+    parser.add_argument("--start-rate", type=float, help="Initial rate for the ramp profile")
+    parser.add_argument("--burst-factor", type=float, default=1.0,
+                        help="Rate multiplier during Poisson bursts")
+    parser.add_argument("--burst-interval", type=float, default=10.0, help="Seconds between burst starts")
+    parser.add_argument("--burst-duration", type=float, default=2.0, help="Length of each burst in seconds")
+    parser.add_argument("--mix", default=mix or ",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()),
+                        help="Traffic mix, e.g. predict=0.8,error=0.1,slow=0.05,health=0.05")
+    parser.add_argument("--max-connections", type=int, default=100, help="Keep-alive connection pool size")
+    parser.add_argument("--json", dest="json_path", help="Write the JSON summary to this file")
+    return parser
+
+
+def main(argv=None, description="Open-loop load generator for the Titanic API", **defaults):
+    parser = build_parser(description, **defaults)
+    args = parser.parse_args(argv)
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print("🚀 Starting load generator...")
+    print(f"📡 Target API: {args.url}")
+    print(f"⏱️  Profile: {args.profile}, rate {args.rate} req/s for {args.duration:.0f}s, mix {mix}")
+
+    config = {
+        "url": args.url,
+        "profile": args.profile,
+        "rate": args.rate,
+        "start_rate": args.start_rate,
+        "duration": args.duration,
+        "burst_factor": args.burst_factor,
+        "mix": mix,
+    }
+    stats, sent, elapsed = asyncio.run(run_load(
+        args.url, mix, args.profile, args.rate, args.duration, args.start_rate,
+        args.burst_factor, args.burst_interval, args.burst_duration, args.max_connections,
+    ))
+    summary = build_summary(stats, sent, elapsed, config)
+    print_report(summary)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"💾 JSON summary written to {args.json_path}")
+    else:
+        print(json.dumps(summary))
+    print("✅ Load generation completed!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""Query logs/app.log through the sidecar index in log_analytics.py.
+
+Usage:
+    python scripts/query_logs.py --last 1h
+    python scripts/query_logs.py --last 1h --type prediction --percentiles 50,99
+    python scripts/query_logs.py --start "2025-06-09 12:00" --end "2025-06-09 13:00" --type error
+    python scripts/query_logs.py --type prediction --low-confidence 0.7 --json
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_analytics import EVENT_TYPES, LEVELS, LogIndex, aggregate, query
+
+DEFAULT_LOG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "app.log")
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(text):
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhd])", text.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid duration '{text}' (use e.g. 30m, 1h, 2d)")
+    return float(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+
+def parse_time(text):
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid time '{text}' (use ISO format, e.g. 2025-06-09 12:00)")
+
+
+def print_summary(summary):
+    print(f"📄 {summary['records']} records, {summary['time_range']['start']} -> {summary['time_range']['end']} "
+          f"({summary['blocks_scanned']}/{summary['blocks_total']} index blocks scanned)")
+    print("\nBy event type:")
+    for name, count in summary["by_event_type"].items():
+        print(f"   {name:<18}{count:>8}")
+    print("\nBy level:")
+    for name, count in summary["by_level"].items():
+        print(f"   {name:<18}{count:>8}")
+    predictions = summary["predictions"]
+    if predictions["count"]:
+        print(f"\n🤖 Predictions: {predictions['count']}, mean confidence {predictions['mean_confidence']}")
+        for name, value in predictions["processing_time_seconds"].items():
+            print(f"   processing_time {name}: {value}s")
+        for result, count in predictions["by_result"].items():
+            print(f"   {result}: {count}")
+    low = summary["low_confidence"]
+    if low["count"] or low["warnings_logged"]:
+        print(f"\n⚠️  Low confidence (< {low['threshold']}): {low['count']} predictions, "
+              f"{low['warnings_logged']} warnings logged")
+        for result, count in low["by_result"].items():
+            print(f"   {result}: {count}")
+        for pclass, count in low["by_passenger_class"].items():
+            print(f"   Pclass {pclass}: {count}")
+    errors = summary["errors"]
+    if errors["count"]:
+        print(f"\n❌ Errors: {errors['count']}")
+        for entry in errors["top"]:
+            print(f"   {entry['count']:>6}  {entry['message']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexed queries over the Titanic API log")
+    parser.add_argument("log", nargs="?", default=DEFAULT_LOG, help="Log file (default: logs/app.log)")
+    parser.add_argument("--start", type=parse_time, help="Start time (ISO)")
+    parser.add_argument("--end", type=parse_time, help="End time (ISO)")
+    parser.add_argument("--last", type=parse_duration,
+                        help="Only the last N s/m/h/d before the newest record, e.g. 1h")
+    parser.add_argument("--type", action="append", choices=EVENT_TYPES, help="Event type filter (repeatable)")
+    parser.add_argument("--level", action="append", choices=LEVELS, help="Level filter (repeatable)")
+    parser.add_argument("--percentiles", default="50,90,99", help="processing_time percentiles")
+    parser.add_argument("--low-confidence", type=float, default=0.6, help="Low-confidence threshold")
+    parser.add_argument("--top-errors", type=int, default=10, help="Number of error groups to show")
+    parser.add_argument("--reindex", action="store_true", help="Rebuild the sidecar index from scratch")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.log):
+        print(f"❌ Log file not found: {args.log}")
+        return 1
+    index = LogIndex(args.log)
+    if args.reindex and os.path.exists(index.index_path):
+        os.remove(index.index_path)
+
+    start, end = args.start, args.end
+    if args.last is not None:
+        index.refresh()
+        newest = index.last_timestamp
+        if newest is not None:
+            start = newest - args.last
+    percentiles = [float(p) for p in args.percentiles.split(",")]
+    columns = query(args.log, start, end, args.type, args.level)
+    summary = aggregate(columns, percentiles, args.low_confidence, args.top_errors)
+
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        print_summary(summary)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
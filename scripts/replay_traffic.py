@@ -0,0 +1,169 @@
+"""Replay captured traffic (CAPTURE_ENABLED=true) against a target API.
+
+Requests are sent in their original order, at the original pace, scaled by
+--speed, or as fast as possible with --max-speed. Predictions are diffed
+against the responses recorded at capture time and latency percentiles are
+reported per endpoint.
+
+Usage:
+    python scripts/replay_traffic.py logs/capture
+    python scripts/replay_traffic.py logs/capture --speed 4
+    python scripts/replay_traffic.py logs/capture/capture-*.jsonl.gz --max-speed --concurrency 64
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capture import read_capture
+from load_generator import API_BASE_URL, EndpointStats
+
+# Response fields that must match between capture and replay
+COMPARED_FIELDS = ("prediction",)
+
+
+def collect_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "capture-*.jsonl*"))))
+        else:
+            files.extend(sorted(glob.glob(path)))
+    return files
+
+
+def diff_response(expected, actual, tolerance):
+    """Return a list of differences between a captured and a replayed response"""
+    if not isinstance(expected, dict) or not isinstance(actual, dict):
+        return []
+    differences = []
+    for field in COMPARED_FIELDS:
+        if field in expected and expected.get(field) != actual.get(field):
+            differences.append(f"{field}: {expected.get(field)!r} -> {actual.get(field)!r}")
+    expected_proba = expected.get("probabilities") or {}
+    actual_proba = actual.get("probabilities") or {}
+    for label, value in expected_proba.items():
+        new_value = actual_proba.get(label)
+        if new_value is None or abs(new_value - value) > tolerance:
+            differences.append(f"probabilities.{label}: {value} -> {new_value}")
+    return differences
+
+
+async def replay(records, base_url, speed, max_speed, concurrency, tolerance):
+    import httpx
+
+    stats = {}
+    mismatches = []
+    compared = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async def send(record, scheduled):
+        nonlocal compared
+        path = record["path"] + (f"?{record['query']}" if record.get("query") else "")
+        entry = stats.setdefault(record["path"], EndpointStats())
+        async with semaphore:
+            sent = time.perf_counter()
+            try:
+                response = await client.request(record["method"], path, json=record.get("body"))
+            except Exception:
+                response = None
+            done = time.perf_counter()
+        # Request lỗi/timeout vẫn vào histogram với latency tới lúc lỗi (như load_generator)
+        entry.response_time.record(done - (scheduled if scheduled is not None else sent))
+        entry.service_time.record(done - sent)
+        if response is None:
+            entry.failures += 1
+            return
+        code = str(response.status_code)
+        entry.status_codes[code] = entry.status_codes.get(code, 0) + 1
+        expected = record.get("response")
+        if record.get("status") == 200 and response.status_code == 200 and isinstance(expected, dict):
+            compared += 1
+            differences = diff_response(expected, response.json(), tolerance)
+            if differences:
+                mismatches.append({"path": record["path"], "body": record.get("body"), "differences": differences})
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        tasks = []
+        start = time.perf_counter()
+        first_ts = records[0]["ts"] if records else 0.0
+        for record in records:
+            scheduled = None
+            if not max_speed:
+                scheduled = start + (record["ts"] - first_ts) / speed
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(record, scheduled)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    return stats, mismatches, compared, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured Titanic API traffic")
+    parser.add_argument("paths", nargs="+", help="Capture directories or files (globs allowed)")
+    parser.add_argument("--url", default=API_BASE_URL, help="Target API base URL")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier (2 = twice as fast)")
+    parser.add_argument("--max-speed", action="store_true", help="Ignore capture timing and send as fast as possible")
+    parser.add_argument("--concurrency", type=int, default=32, help="Maximum requests in flight")
+    parser.add_argument("--tolerance", type=float, default=0.001, help="Allowed probability difference")
+    parser.add_argument("--limit", type=int, help="Replay at most this many records")
+    parser.add_argument("--json", dest="json_path", help="Write the JSON report to this file")
+    args = parser.parse_args()
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    files = collect_files(args.paths)
+    if not files:
+        print("❌ No capture files found")
+        return 1
+    records = sorted(read_capture(files), key=lambda r: r["ts"])
+    if args.limit:
+        records = records[:args.limit]
+    mode = "max speed" if args.max_speed else f"{args.speed}x"
+    print(f"🎬 Replaying {len(records)} requests from {len(files)} file(s) to {args.url} at {mode}")
+
+    stats, mismatches, compared, elapsed = asyncio.run(replay(
+        records, args.url, args.speed, args.max_speed, args.concurrency, args.tolerance
+    ))
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "files": files,
+        "mode": mode,
+        "requests": len(records),
+        "elapsed_seconds": round(elapsed, 3),
+        "achieved_rps": round(len(records) / elapsed, 2) if elapsed > 0 else 0.0,
+        "predictions_compared": compared,
+        "prediction_mismatches": len(mismatches),
+        "endpoints": {path: entry.summary() for path, entry in stats.items()},
+        "mismatches": mismatches[:100],
+    }
+
+    print(f"\n{'endpoint':<17}{'count':>8}{'fail':>6}{'p50 ms':>10}{'p99 ms':>10}{'p99.9 ms':>10}{'max ms':>10}")
+    for path, data in report["endpoints"].items():
+        rt = data["response_time"]
+        print(f"{path:<17}{data['requests']:>8}{data['failures']:>6}{rt['p50_ms']:>10.2f}"
+              f"{rt['p99_ms']:>10.2f}{rt['p999_ms']:>10.2f}{rt['max_ms']:>10.2f}")
+    for mismatch in mismatches[:10]:
+        print(f"⚠️  {mismatch['path']} {json.dumps(mismatch['body'])}: {'; '.join(mismatch['differences'])}")
+    print(f"\n🔍 Predictions compared: {compared}, mismatches: {len(mismatches)}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report written to {args.json_path}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
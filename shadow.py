@@ -0,0 +1,94 @@
+"""Shadow scoring of a candidate model off the request path.
+
+`/predict` hands a sampled copy of its input to `ShadowScorer.submit`, which
+only does a `put_nowait` on a bounded queue. Worker threads score the
+candidate and report latency and agreement with the primary prediction
+through `on_result`; when the queue is full the sample is dropped, so the
+candidate can never slow down the primary response.
+"""
+import logging
+import queue
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class ShadowScorer:
+    """Score a sampled fraction of traffic with a candidate model in the background"""
+
+    def __init__(self, manager, sample_rate=0.1, workers=2, queue_size=1000, on_result=None):
+        self.manager = manager
+        self.sample_rate = sample_rate
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.on_result = on_result
+        self.submitted = 0
+        self.dropped = 0
+        self.compared = 0
+        self.disagreements = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._threads = []
+
+    @property
+    def disagreement_rate(self):
+        return self.disagreements / self.compared if self.compared else 0.0
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"shadow-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5.0):
+        for _ in self._threads:
+            try:
+                self.queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, X, primary_prediction, primary_survival_proba):
+        """Maybe queue an input for shadow scoring; never blocks the caller"""
+        if random.random() >= self.sample_rate:
+            return False
+        try:
+            self.queue.put_nowait((X, primary_prediction, primary_survival_proba))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        return True
+
+    def _score(self, X, primary_prediction, primary_survival_proba):
+        candidate = self.manager.current
+        start = time.perf_counter()
+        # Một lần predict_proba như primary path để so sánh latency công bằng
+        pred_proba = candidate.model.predict_proba(X)[0]
+        pred = candidate.model.classes_[pred_proba.argmax()]
+        duration = time.perf_counter() - start
+        agreed = int(pred) == int(primary_prediction)
+        with self._lock:
+            self.compared += 1
+            if not agreed:
+                self.disagreements += 1
+        if self.on_result:
+            self.on_result(candidate.version, duration, agreed, abs(float(pred_proba[1]) - primary_survival_proba))
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+            try:
+                self._score(*item)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                logger.error(f"❌ Shadow scoring failed: {e}")